@@ -13,11 +13,14 @@ MÓDULOS PRINCIPAIS:
 - config: Configurações do sistema
 - database: Operações com banco de dados MySQL
 - event_logger: Sistema de logging de eventos
+- json_io: Leitura e escrita rápidas de JSON (orjson, se instalado)
+- motion: Funções rápidas (Numba) para a detecção de movimento
 - object_detector: Detecção de objetos usando IA (YOLO)
 - routes: Rotas principais da aplicação
 - stats: Estatísticas e métricas do sistema
 - video_converter: Conversão de formatos de vídeo
 - video_stream: Streaming de vídeo para a interface web
+- video_writer: Gravação de vídeo via FFmpeg (codificadores de hardware)
 """
 
 __version__ = '1.0.0'
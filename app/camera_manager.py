@@ -7,9 +7,11 @@ Este módulo gerencia câmeras dinamicamente, permitindo adicionar, remover e
 editar câmeras sem precisar modificar o código.
 """
 
+import copy
 import json
 import os
 from threading import Lock
+from app import json_io
 
 # Arquivo onde as câmeras serão salvas
 CAMERAS_CONFIG_FILE = 'config/cameras_config.json'
@@ -18,6 +20,35 @@ SYSTEM_CONFIG_FILE = 'config/system_config.json'
 # Lock para operações de arquivo
 config_lock = Lock()
 
+# Cache dos arquivos de configuração já convertidos (dicionários)
+# caminho -> ((mtime_ns, tamanho), dicionário)
+# Os arquivos só são lidos e convertidos de novo quando a data de modificação ou o
+# tamanho mudam (as rotas de estatísticas e de configurações leem a cada requisição)
+_config_cache = {}
+
+def _ler_json(caminho):
+    """
+    Lê um arquivo JSON usando o cache do conteúdo.
+    IMPORTANTE: Deve ser chamada dentro de um 'with config_lock:'
+    
+    O dicionário retornado é o próprio cache (compartilhado entre as
+    requisições): quem for alterá-lo deve usar uma cópia (copy.deepcopy).
+    
+    caminho: Caminho do arquivo JSON
+    
+    Retorna: Dicionário com o conteúdo do arquivo
+    """
+    info = os.stat(caminho)
+    chave = (info.st_mtime_ns, info.st_size)
+    
+    cache = _config_cache.get(caminho)
+    if cache is None or cache[0] != chave:
+        with open(caminho, 'rb') as f:
+            cache = (chave, json_io.loads(f.read()))
+        _config_cache[caminho] = cache
+    
+    return cache[1]
+
 # ============================================================================
 # FUNÇÕES DE GERENCIAMENTO DE CÂMERAS
 # ============================================================================
@@ -26,6 +57,7 @@ def load_cameras_config():
     """
     Carrega a configuração de câmeras do arquivo JSON.
     Se o arquivo não existir, retorna a configuração padrão.
+    O dicionário vem do cache: para alterá-lo, use copy.deepcopy.
     """
     with config_lock:
         if not os.path.exists(CAMERAS_CONFIG_FILE):
@@ -46,8 +78,7 @@ def load_cameras_config():
             return default_config
         
         try:
-            with open(CAMERAS_CONFIG_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return _ler_json(CAMERAS_CONFIG_FILE)
         except Exception as e:
             print(f"Erro ao carregar configuração de câmeras: {e}")
             return {}
@@ -57,6 +88,8 @@ def save_cameras_config(cameras_config):
     Salva a configuração de câmeras no arquivo JSON.
     """
     with config_lock:
+        # Descarta o conteúdo em cache (a próxima leitura pega o arquivo novo)
+        _config_cache.pop(CAMERAS_CONFIG_FILE, None)
         try:
             with open(CAMERAS_CONFIG_FILE, 'w', encoding='utf-8') as f:
                 json.dump(cameras_config, f, indent=4, ensure_ascii=False)
@@ -78,7 +111,7 @@ def add_camera(cam_id, source, name="Nova Câmera", enabled=True):
     Returns:
         (sucesso, mensagem)
     """
-    cameras = load_cameras_config()
+    cameras = copy.deepcopy(load_cameras_config())
     
     if cam_id in cameras:
         return False, f"Já existe uma câmera com o ID '{cam_id}'"
@@ -104,7 +137,7 @@ def remove_camera(cam_id):
     """
     Remove uma câmera da configuração.
     """
-    cameras = load_cameras_config()
+    cameras = copy.deepcopy(load_cameras_config())
     
     if cam_id not in cameras:
         return False, f"Câmera '{cam_id}' não encontrada"
@@ -120,7 +153,7 @@ def update_camera(cam_id, source=None, name=None, enabled=None):
     """
     Atualiza as informações de uma câmera.
     """
-    cameras = load_cameras_config()
+    cameras = copy.deepcopy(load_cameras_config())
     
     if cam_id not in cameras:
         return False, f"Câmera '{cam_id}' não encontrada"
@@ -162,6 +195,7 @@ def list_cameras():
 def load_system_config():
     """
     Carrega as configurações do sistema.
+    O dicionário vem do cache: para alterá-lo, use copy.deepcopy.
     """
     with config_lock:
         if not os.path.exists(SYSTEM_CONFIG_FILE):
@@ -191,8 +225,7 @@ def load_system_config():
             return default_config
         
         try:
-            with open(SYSTEM_CONFIG_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return _ler_json(SYSTEM_CONFIG_FILE)
         except Exception as e:
             print(f"Erro ao carregar configurações do sistema: {e}")
             return {}
@@ -202,6 +235,8 @@ def save_system_config(config):
     Salva as configurações do sistema.
     """
     with config_lock:
+        # Descarta o conteúdo em cache (a próxima leitura pega o arquivo novo)
+        _config_cache.pop(SYSTEM_CONFIG_FILE, None)
         try:
             with open(SYSTEM_CONFIG_FILE, 'w', encoding='utf-8') as f:
                 json.dump(config, f, indent=4, ensure_ascii=False)
@@ -219,7 +254,7 @@ def update_system_config(section, key, value):
         key: Chave da configuração (ex: "cooldown")
         value: Novo valor
     """
-    config = load_system_config()
+    config = copy.deepcopy(load_system_config())
     
     if section not in config:
         config[section] = {}
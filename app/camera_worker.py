@@ -13,6 +13,10 @@ Este arquivo contém a classe CameraWorker, que é responsável por:
 import cv2  # OpenCV - para trabalhar com vídeo e câmeras
 import time  # Para medir tempo (cooldown da detecção de movimento)
 import threading  # Para rodar cada câmera em paralelo (threads)
+import queue  # Fila de frames entre a captura e a thread de gravação
+from collections import deque  # Histórico das métricas de desempenho
+import importlib.util  # Para verificar se um pacote está instalado sem importá-lo
+import os  # Para apagar o arquivo vazio deixado por um FFmpeg que falhou
 import numpy as np  # Para criar arrays de imagens
 
 # Importa VLC Python para streams RTSP (opcional)
@@ -26,17 +30,28 @@ except ImportError:
 
 # Importa as configurações
 from app.config import (
-    PASTA_GRAVACOES, MOTION_COOLDOWN, MIN_CONTOUR_AREA,
+    PASTA_GRAVACOES, RECORDING_CODEC, FFMPEG_HW_ENCODER, MOTION_COOLDOWN, MIN_CONTOUR_AREA,
+    MOTION_HEIGHT, ACCELERATE, MOTION_ALGORITHM, MOTION_ROI_ENABLED, MOTION_ROI_RESET_FRAMES,
+    DETECTION_STRIDE, STREAM_JPEG_QUALITY, STREAM_MAX_WIDTH,
     OBJECT_DETECTION_ENABLED, YOLO_MODEL, OBJECT_CONFIDENCE_THRESHOLD,
     OBJECT_CLASSES_FILTER, AUTO_RECORD_ON_OBJECTS
 )
 
-# Importa o detector de objetos (opcional - só carrega se necessário)
-try:
-    from app.object_detector import ObjectDetector
-    OBJECT_DETECTION_AVAILABLE = True
-except ImportError:
-    OBJECT_DETECTION_AVAILABLE = False
+# Importa as funções rápidas da detecção de movimento (Numba, se instalado)
+from app.motion import diff_thresh, bgr_to_gray_down, draw_boxes
+
+# Importa o codificador JPEG do stream ao vivo (TurboJPEG, se instalado)
+from app.video_stream import encode_jpeg, montar_parte_mjpeg
+
+# Importa o gravador via FFmpeg (usado pelo codec H264_HW)
+from app.video_writer import FFmpegWriter
+
+# Detector de objetos (opcional - só carrega se necessário)
+# Aqui só verifica se o ultralytics está instalado, SEM importá-lo:
+# importar o ultralytics carrega o PyTorch, o que leva alguns segundos.
+# O ObjectDetector só é importado quando a detecção de objetos é ligada.
+OBJECT_DETECTION_AVAILABLE = importlib.util.find_spec('ultralytics') is not None
+if not OBJECT_DETECTION_AVAILABLE:
     print("AVISO: Detecção de objetos não disponível. Instale ultralytics: pip install ultralytics")
 
 # Importa o logger de eventos
@@ -48,6 +63,27 @@ except ImportError:
     print("AVISO: Logger de eventos não disponível.")
 
 
+# Formatos de gravação disponíveis (escolhido por RECORDING_CODEC no config.py)
+# - 'fourcc': codec usado pelo cv2.VideoWriter
+# - 'ffmpeg': argumentos do codificador quando a gravação é feita pelo FFmpeg
+RECORDING_FORMATS = {
+    # VP80 usa o libvpx do FFmpeg em modo tempo real (bem mais rápido que o
+    # cv2.VideoWriter); sem FFmpeg, grava com o OpenCV (fourcc)
+    'VP80': {
+        'ext': '.webm',
+        'fourcc': 'VP80',
+        'ffmpeg': ['-c:v', 'libvpx', '-deadline', 'realtime', '-cpu-used', '6',
+                   '-b:v', '512k', '-qmin', '18', '-qmax', '40', '-threads', '1']
+    },
+    'MJPG': {'ext': '.avi', 'fourcc': 'MJPG'},
+    'H264_HW': {
+        'ext': '.mp4',
+        'ffmpeg': ['-c:v', FFMPEG_HW_ENCODER, '-pix_fmt', 'yuv420p']
+                  + (['-preset', 'ultrafast', '-tune', 'zerolatency'] if FFMPEG_HW_ENCODER == 'libx264' else [])
+    },
+}
+
+
 def create_no_camera_frame(cam_id, width=640, height=480):
     """
     Cria um frame informativo quando a câmera não está disponível.
@@ -118,6 +154,13 @@ class CameraWorker(threading.Thread):
     - Processa detecção de movimento (se estiver ativada)
     - Grava vídeo quando necessário
     - Armazena o último frame para transmissão ao vivo
+    
+    POR QUE THREADS (E NÃO PROCESSOS):
+    As rotas do Flask leem e alteram o estado da câmera diretamente (gravação,
+    detecção, estatísticas, o JPEG do stream), o que só funciona no mesmo
+    processo. O trabalho pesado de cada frame (leitura/decodificação, OpenCV,
+    MOG2, funções do Numba com nogil e o codificador no FFmpeg) roda fora do
+    GIL, então várias câmeras já usam núcleos diferentes ao mesmo tempo.
     """
     
     def __init__(self, cam_id, source):
@@ -137,6 +180,10 @@ class CameraWorker(threading.Thread):
         # Daemon = True significa que a thread para quando o programa principal parar
         self.daemon = True
         
+        # Sinal de parada: o release() liga este evento e o loop run() termina
+        # As esperas de reconexão usam este evento, então acordam na hora
+        self._parar = threading.Event()
+        
         print(f"Iniciando câmera: {self.cam_id}")
         
         # ================================================================
@@ -144,6 +191,7 @@ class CameraWorker(threading.Thread):
         # ================================================================
         # Verifica se source é uma string começando com "rtsp://" (câmera IP)
         is_rtsp = isinstance(source, str) and source.lower().startswith('rtsp://')
+        self.is_rtsp = is_rtsp
         
         # Se for RTSP e VLC está disponível, usa VLC (mais eficiente)
         # Caso contrário, usa OpenCV (funciona para USB e RTSP, mas menos eficiente para RTSP)
@@ -152,6 +200,9 @@ class CameraWorker(threading.Thread):
         self.vlc_instance = None  # Instância VLC
         self.vlc_player = None  # Player VLC
         
+        # FPS informado pela fonte ao abrir a câmera (0 = a fonte não informou)
+        self.source_fps = 0.0
+        
         if self.use_vlc:
             # ============================================================
             # CONFIGURAÇÃO VLC PARA STREAMS RTSP
@@ -183,17 +234,14 @@ class CameraWorker(threading.Thread):
             # CONFIGURAÇÃO OPENCV (USB ou RTSP fallback)
             # ============================================================
             print(f"  [{self.cam_id}] Usando OpenCV ({'USB' if not is_rtsp else 'RTSP fallback'})")
-            self.cap = cv2.VideoCapture(source)
-            # Para RTSP, configura timeouts maiores
-            if is_rtsp:
-                self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Reduz buffer para menor latência
+            self.cap = self._open_capture()
             # Verifica se a câmera foi aberta com sucesso
             if not self.cap.isOpened():
                 print(f"ERRO: Não foi possível abrir a câmera {self.cam_id}")
         
         # LOCKS (Cadeados) - Previnem conflitos quando múltiplas threads acessam os mesmos dados
-        # frame_lock: protege o frame que é transmitido ao vivo
-        self.frame_lock = threading.Lock()
+        # O frame do stream (output_frame) não precisa de lock: trocar a referência
+        # de um atributo é uma operação atômica no Python (GIL)
         # state_lock: protege todas as variáveis de estado (gravação, detecção, etc)
         self.state_lock = threading.Lock()
         
@@ -203,18 +251,106 @@ class CameraWorker(threading.Thread):
         # Este frame é o que aparece no stream ao vivo
         self.output_frame = None
         
+        # Anel de buffers para os frames processados (alocado no primeiro frame)
+        # Cada frame novo é copiado para o próximo buffer do anel, em vez de
+        # alocar um array novo a cada frame. _head = buffer do último frame
+        self._ring = None
+        self._head = 0
+        
+        # Buffer do frame reduzido para o stream (quando o frame é maior que STREAM_MAX_WIDTH)
+        self._stream_buf = None
+        
+        # Último frame já codificado em JPEG, com o cabeçalho do MJPEG
+        # (exatamente os bytes enviados para os navegadores)
+        # A codificação é feita UMA vez por frame, e não uma vez por cliente
+        self.mjpeg_part = None
+        
+        # Condition: acorda os clientes do stream quando há um frame novo
+        # Também protege o contador de clientes conectados
+        self.frame_cv = threading.Condition()
+        
+        # Número do último frame publicado (aumenta a cada frame novo)
+        # Os clientes do stream usam isso para não enviar o mesmo frame duas vezes
+        self.frame_seq = 0
+        
+        # Quantos navegadores estão assistindo o stream desta câmera
+        # Se ninguém está assistindo, não precisa codificar JPEG
+        self.stream_clients = 0
+        
         # Indica se está gravando no momento
         self.is_recording = False
         
         # Objeto que escreve o vídeo no arquivo (None quando não está gravando)
+        # Depois de criado, só a thread de gravação usa: ela também o fecha no fim
         self.video_writer = None
         
+        # Fila de frames para gravação e a thread que consome essa fila
+        # A codificação VP80 é lenta (20-50 ms por frame), então ela roda em uma
+        # thread separada para não travar a leitura da câmera
+        self.write_q = None
+        self.writer_thread = None
+        
+        # Quantos frames foram descartados porque a fila de gravação estava cheia
+        self.dropped_frames = 0
+        
+        # Métricas de desempenho: tempo de cada etapa do loop (em milissegundos)
+        # Guarda só as últimas 100 medições de cada etapa (a mais antiga sai sozinha)
+        self.stats = {
+            'capture_ms': deque(maxlen=100),  # Leitura do frame da câmera
+            'motion_ms': deque(maxlen=100),   # Detecção de movimento
+            'encode_ms': deque(maxlen=100),   # Codificação JPEG do stream
+            'write_ms': deque(maxlen=100),    # Escrita no arquivo (thread de gravação)
+            'fps': 0.0                        # Frames processados por segundo
+        }
+        self._fps_frames = 0  # Frames contados desde _fps_start
+        self._fps_start = time.perf_counter()
+        
         # Indica se a detecção de movimento está ativada
         self.motion_detection_enabled = False
         
-        # Imagem do fundo estático (usada para comparar e detectar movimento)
-        # None significa que ainda não foi definido
-        self.static_background = None
+        # Modelo do fundo (MOG2) da detecção de movimento
+        # bg_ready = False até o primeiro frame ser usado para criar o modelo
+        self.bg_subtractor = self._create_bg_subtractor()
+        self.bg_ready = False
+        
+        # Referências da detecção de movimento por 3 frames seguidos
+        # (não precisa de um fundo estático)
+        # None significa que ainda não foram definidas
+        self.prev1_gray = None  # Frame anterior (k-1) em cinza
+        self.prev_thresh = None  # Máscara da diferença entre os frames k-1 e k-2
+        self.prev_thresh_roi = None  # Região (x0, y0, x1, y1) onde prev_thresh foi calculada
+        
+        # Região de interesse (ROI) da detecção: só procura movimento perto de onde
+        # ele foi visto por último (None = procura no frame inteiro)
+        self.motion_roi = None
+        self.last_motion_roi = None  # Região usada no frame anterior (x0, y0, x1, y1)
+        self._roi_misses = 0  # Frames seguidos sem movimento dentro da região
+        self._roi_box = None  # Retângulo do movimento no frame anterior (para estimar o deslocamento)
+        
+        # Usa OpenCL (GPU) com cv2.UMat se estiver disponível e ativado (ACCELERATE)
+        # Sem OpenCL, usa numpy + Numba na CPU
+        self.use_opencl = ACCELERATE and cv2.ocl.haveOpenCL() and cv2.ocl.useOpenCL()
+        
+        # Buffers de trabalho da detecção no caminho da CPU (alocados no primeiro frame)
+        # Reusar os mesmos arrays evita alocar várias imagens novas a cada frame
+        # O frame em cinza desfocado e a máscara têm dois buffers cada, porque o
+        # do frame atual vira a referência "anterior" no próximo frame
+        self._gray = None  # Frame em cinza
+        self._blur_bufs = None  # Frame em cinza desfocado (2 buffers)
+        self._thresh_bufs = None  # Máscara da diferença (2 buffers)
+        self._mask = None  # Máscara final de movimento
+        self._buf_idx = 0  # Qual dos dois buffers é o do frame atual
+        
+        # A detecção roda no frame reduzido para ~MOTION_HEIGHT pixels de altura
+        # Estes valores são calculados no primeiro frame (ou se a resolução mudar)
+        self._motion_frame_size = None  # (altura, largura) do frame original
+        self._motion_step = 1  # Fator de redução (usa 1 pixel a cada _motion_step)
+        self._blur_size = 21  # Tamanho do kernel do desfoque no frame reduzido
+        self._min_area = MIN_CONTOUR_AREA  # Área mínima no frame reduzido
+        
+        # Procura movimento só a cada DETECTION_STRIDE frames
+        self._det_counter = 0  # Frames contados desde que a câmera iniciou
+        self._last_boxes = []  # Retângulos da última detecção (repetidos nos frames pulados)
         
         # Timestamp (momento) da última vez que movimento foi detectado
         self.last_motion_time = 0
@@ -243,6 +379,7 @@ class CameraWorker(threading.Thread):
         # Inicializa o detector de objetos se estiver disponível e habilitado
         if OBJECT_DETECTION_AVAILABLE and self.object_detection_enabled:
             try:
+                from app.object_detector import ObjectDetector
                 self.object_detector = ObjectDetector(
                     model_path=YOLO_MODEL,
                     conf_threshold=OBJECT_CONFIDENCE_THRESHOLD
@@ -256,17 +393,149 @@ class CameraWorker(threading.Thread):
 
     def get_latest_frame(self):
         """
-        Pega o último frame processado de forma segura.
-        Retorna uma CÓPIA do frame para não causar conflitos.
+        Pega o último frame processado.
+        IMPORTANTE: Retorna o PRÓPRIO frame (sem cópia). Quem chama não deve
+        modificá-lo; se precisar desenhar nele ou guardá-lo, faça uma cópia antes
+        (o buffer é reaproveitado pela câmera alguns frames depois).
         
         Retorna: Frame em formato numpy array, ou None se não houver frame
         """
-        # Usa o lock para acessar o frame de forma segura
-        with self.frame_lock:
-            if self.output_frame is None:
-                return None
-            # Retorna uma CÓPIA para não modificar o original
-            return self.output_frame.copy()
+        # A thread da câmera sempre troca output_frame por outro buffer
+        # (nunca altera o publicado), então ler a referência é seguro sem lock
+        return self.output_frame
+    
+    def _next_ring_buffer(self, frame):
+        """
+        Copia o frame para o próximo buffer do anel e retorna esse buffer.
+        
+        Só a thread da câmera escreve no anel, e ela nunca escreve no buffer
+        do frame publicado por último (são 4 buffers). Quem pegar um frame com
+        get_latest_frame e guardar por vários frames deve fazer uma cópia.
+        
+        frame: Frame original (numpy array BGR)
+        
+        Retorna: Buffer do anel com a cópia do frame
+        """
+        # Aloca os buffers no primeiro frame (ou se a resolução mudar)
+        if self._ring is None or self._ring[0].shape != frame.shape:
+            self._ring = [np.empty_like(frame) for _ in range(4)]
+        
+        # & 3 = resto da divisão por 4 (volta para o início do anel)
+        slot = (self._head + 1) & 3
+        np.copyto(self._ring[slot], frame)
+        self._head = slot
+        return self._ring[slot]
+    
+    def _publish_frame(self, frame):
+        """
+        Armazena o frame para o stream ao vivo e avisa os clientes conectados.
+        O JPEG é codificado aqui, uma única vez, e compartilhado por todos os clientes.
+        
+        frame: Frame (numpy array) que deve aparecer no stream
+        """
+        # Troca a referência (atômico) - o frame antigo nunca é alterado
+        self.output_frame = frame
+        
+        # Codifica fora do lock para não travar os clientes enquanto isso
+        parte = None
+        if self.stream_clients > 0:
+            t0 = time.perf_counter()
+            jpeg = encode_jpeg(self._reduce_for_stream(frame), quality=STREAM_JPEG_QUALITY)
+            if jpeg is not None:
+                parte = montar_parte_mjpeg(jpeg)
+            self.stats['encode_ms'].append((time.perf_counter() - t0) * 1000)
+        
+        with self.frame_cv:
+            if parte is not None:
+                self.mjpeg_part = parte
+            self.frame_seq += 1
+            self.frame_cv.notify_all()
+    
+    def _reduce_for_stream(self, frame):
+        """
+        Reduz o frame para a largura máxima do stream (STREAM_MAX_WIDTH).
+        O frame reduzido é escrito sempre no mesmo buffer (não aloca um por frame).
+        
+        frame: Frame (numpy array BGR)
+        
+        Retorna: O frame reduzido, ou o próprio frame se ele já for pequeno
+        """
+        altura, largura = frame.shape[:2]
+        if not STREAM_MAX_WIDTH or largura <= STREAM_MAX_WIDTH:
+            return frame
+        
+        nova_altura = altura * STREAM_MAX_WIDTH // largura
+        if self._stream_buf is None or self._stream_buf.shape[:2] != (nova_altura, STREAM_MAX_WIDTH):
+            self._stream_buf = np.empty((nova_altura, STREAM_MAX_WIDTH, 3), dtype=frame.dtype)
+        
+        cv2.resize(frame, (STREAM_MAX_WIDTH, nova_altura), dst=self._stream_buf,
+                   interpolation=cv2.INTER_LINEAR)
+        return self._stream_buf
+    
+    def _grab_latest(self, cap):
+        """
+        Lê o frame mais recente de um VideoCapture, pulando frames atrasados.
+        
+        cap.read() = cap.grab() + cap.retrieve(). No backend FFmpeg o grab()
+        já decodifica o frame; o retrieve() só faz a conversão para BGR. Em
+        streams de rede (RTSP) que ficaram para trás, descartamos os frames
+        acumulados com grab() e convertemos apenas o último.
+        
+        cap: VideoCapture de onde ler
+        Retorna: Frame numpy array ou None se falhar
+        """
+        inicio = time.perf_counter()
+        if not cap.grab():
+            return None
+        
+        # Se o primeiro grab esperou um frame novo, o buffer já estava vazio:
+        # descartar mais um faria esperar o próximo frame (metade do FPS)
+        if self.is_rtsp and time.perf_counter() - inicio <= 0.005:
+            # Descarta até 2 frames acumulados no buffer
+            for _ in range(2):
+                inicio = time.perf_counter()
+                if not cap.grab():
+                    break
+                # Se o grab demorou, ele esperou um frame novo: o buffer já está vazio
+                if time.perf_counter() - inicio > 0.005:
+                    break
+        
+        ret, frame = cap.retrieve()
+        if ret:
+            return frame
+        return None
+    
+    def _open_capture(self):
+        """
+        Abre a fonte da câmera com o OpenCV, configurada para baixa latência.
+        
+        - Câmeras de rede e arquivos (texto): usa o backend FFmpeg com
+          decodificação por hardware (GPU) quando disponível, para não
+          gastar CPU decodificando H.264/H.265. Se o FFmpeg não abrir um
+          arquivo, usa o backend padrão. Endereços de rede (rtsp://, http://...)
+          não são tentados de novo: o backend padrão também seria o FFmpeg, e
+          uma câmera fora do ar esperaria o tempo limite de conexão duas vezes.
+        - Webcams USB (número): pede à câmera os frames já em MJPG, que
+          ocupam menos banda no USB (permite mais FPS/resolução).
+        - Nos dois casos, o buffer é de 1 frame (sempre o frame mais recente).
+        
+        Retorna: VideoCapture (verifique isOpened())
+        """
+        if isinstance(self.source, str):
+            cap = cv2.VideoCapture(self.source, cv2.CAP_FFMPEG,
+                                   [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY])
+            if not cap.isOpened() and '://' not in self.source:
+                cap = cv2.VideoCapture(self.source)
+        else:
+            cap = cv2.VideoCapture(self.source)
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+        
+        # Reduz o buffer para menor latência (nem todo backend suporta)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        
+        # Guarda o FPS da fonte agora (lido uma vez só, pela thread que abriu a câmera)
+        self.source_fps = cap.get(cv2.CAP_PROP_FPS)
+        return cap
     
     def _read_frame(self):
         """
@@ -311,13 +580,9 @@ class CameraWorker(threading.Thread):
                 # Abre um VideoCapture separado apenas para ler frames
                 # (VLC gerencia a conexão, mas precisamos dos frames para processar)
                 if not hasattr(self, '_opencv_fallback'):
-                    self._opencv_fallback = cv2.VideoCapture(self.source)
-                    self._opencv_fallback.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+                    self._opencv_fallback = self._open_capture()
                 
-                ret, frame = self._opencv_fallback.read()
-                if ret:
-                    return frame
-                return None
+                return self._grab_latest(self._opencv_fallback)
                 
             except Exception as e:
                 print(f"ERRO ao ler frame via VLC ({self.cam_id}): {e}")
@@ -328,11 +593,566 @@ class CameraWorker(threading.Thread):
             # ============================================================
             if self.cap is None or not self.cap.isOpened():
                 return None
-            ret, frame = self.cap.read()
-            if ret:
-                return frame
-            return None
+            return self._grab_latest(self.cap)
 
+    def _writer_loop(self, video_writer, write_q, params):
+        """
+        Loop da thread de gravação.
+        Pega frames da fila e escreve no arquivo até receber o sinal de parada (None).
+        
+        No fim, a própria thread fecha o arquivo (release). Fechar pode demorar
+        (o FFmpeg termina de codificar os frames pendentes), e assim isso não
+        acontece com o state_lock travado, o que congelaria a captura e o stream.
+        
+        video_writer: Objeto que escreve o vídeo no arquivo (None se nenhum abriu)
+        write_q: Fila de onde os frames são lidos
+        params: (formato, fps, tamanho) da gravação, para trocar de gravador se o FFmpeg falhar
+        """
+        falhou = video_writer is None
+        while True:
+            frame = write_q.get()
+            
+            # None é o sinal de parada enviado por stop_recording_logic
+            if frame is None:
+                break
+            
+            # Sem gravador funcionando: descarta os frames até a gravação parar
+            if video_writer is None:
+                continue
+            
+            try:
+                t0 = time.perf_counter()
+                video_writer.write(frame)
+                self.stats['write_ms'].append((time.perf_counter() - t0) * 1000)
+            except (cv2.error, OSError) as e:
+                # O FFmpeg terminou (BrokenPipeError) ou o arquivo deu erro:
+                # troca para o gravador do OpenCV e grava o frame nele
+                video_writer = self._writer_failed(video_writer, e, params)
+                if video_writer is None:
+                    falhou = True
+                else:
+                    video_writer.write(frame)
+        
+        # Nenhum gravador conseguiu escrever o arquivo
+        if falhou:
+            print(f"ERRO ({self.cam_id}): A gravação falhou; o vídeo não foi salvo por completo.")
+            if EVENT_LOGGING_AVAILABLE:
+                log_event(EventType.SYSTEM_ERROR, EventSeverity.ERROR,
+                         camera_id=self.cam_id,
+                         message=f"Gravação falhou: nenhum gravador conseguiu escrever o vídeo")
+        
+        # Se o video_writer existe, fecha e salva o arquivo
+        if video_writer is not None:
+            video_writer.release()  # Fecha o arquivo
+            print(f"Arquivo de vídeo ({self.cam_id}) salvo e fechado.")
+            
+            # Registra evento de parada de gravação
+            if EVENT_LOGGING_AVAILABLE:
+                log_event(EventType.RECORDING_STOPPED, EventSeverity.INFO,
+                         camera_id=self.cam_id,
+                         message=f"Gravação parada")
+    
+    def _writer_failed(self, video_writer, erro, params):
+        """
+        Trata um erro de escrita na thread de gravação.
+        
+        Se o gravador era o FFmpeg (ex: o FFmpeg fechou por falta do libvpx
+        ou de argumentos inválidos), continua a gravação com o OpenCV
+        (cv2.VideoWriter) em um arquivo novo. Se já era o OpenCV, a gravação
+        falhou: os próximos frames são descartados.
+        
+        video_writer: Gravador que deu erro
+        erro: Exceção lançada pelo write()
+        params: (formato, fps, tamanho) da gravação
+        
+        Retorna: Novo gravador, ou None se não houver como continuar
+        """
+        print(f"ERRO ({self.cam_id}): Falha ao gravar frame: {erro!r}")
+        if EVENT_LOGGING_AVAILABLE:
+            log_event(EventType.SYSTEM_ERROR, EventSeverity.ERROR,
+                     camera_id=self.cam_id,
+                     message=f"Falha ao gravar frame: {erro!r}")
+        video_writer.release()
+        
+        novo = None
+        if isinstance(video_writer, FFmpegWriter):
+            formato, fps, frame_size = params
+            print(f"AVISO ({self.cam_id}): FFmpeg terminou durante a gravação. Gravando com o OpenCV (VideoWriter).")
+            self._ffmpeg_hint(formato)
+            # Se o FFmpeg não chegou a gravar nada, não deixa um arquivo vazio na lista de vídeos
+            try:
+                if os.path.getsize(video_writer.filename) == 0:
+                    os.remove(video_writer.filename)
+            except OSError:
+                pass
+            novo, nome_arquivo = self._open_cv_writer(formato, fps, frame_size)
+            if novo is not None:
+                print(f"Salvando vídeo ({self.cam_id}) em: {nome_arquivo}")
+        return novo
+    
+    def _recording_filename(self, formato):
+        """
+        Cria um nome único para o arquivo de gravação usando data e hora.
+        O nome inclui o ID da câmera para identificar qual câmera gravou.
+        
+        formato: Formato de gravação (de RECORDING_FORMATS)
+        
+        Retorna: Caminho do arquivo
+        """
+        timestr = time.strftime("%d-%m-%Y_%H%M%S")  # Exemplo: 25-12-2024_143022
+        return f"{PASTA_GRAVACOES}/{self.cam_id}-gravacao-{timestr}{formato['ext']}"
+    
+    def _open_video_writer(self, formato, fps, frame_size):
+        """
+        Cria o objeto que escreve o vídeo no arquivo.
+        
+        Formatos com 'ffmpeg' gravam pelo FFmpegWriter. Se o FFmpeg não
+        estiver instalado ou fechar logo ao iniciar, grava com o OpenCV.
+        
+        formato: Formato de gravação (de RECORDING_FORMATS)
+        fps: Frames por segundo do vídeo
+        frame_size: (largura, altura) dos frames
+        
+        Retorna: (video_writer, nome_arquivo) - video_writer é None se nenhum abrir
+        """
+        if 'ffmpeg' in formato:
+            nome_arquivo = self._recording_filename(formato)
+            try:
+                video_writer = FFmpegWriter(nome_arquivo, fps, frame_size, formato['ffmpeg'])
+                if video_writer.isOpened():
+                    return video_writer, nome_arquivo
+                print(f"AVISO ({self.cam_id}): FFmpeg fechou ao iniciar (código {video_writer.proc.returncode}). "
+                      f"Gravando com o OpenCV (VideoWriter).")
+                self._ffmpeg_hint(formato)
+            except FileNotFoundError:
+                print(f"AVISO ({self.cam_id}): FFmpeg não encontrado. Gravando com o OpenCV (VideoWriter).")
+                self._ffmpeg_hint(formato, ffmpeg_ausente=True)
+        return self._open_cv_writer(formato, fps, frame_size)
+    
+    def _ffmpeg_hint(self, formato, ffmpeg_ausente=False):
+        """
+        Explica a troca de formato quando um formato só de FFmpeg (H264_HW) falha.
+        Os motivos mais comuns são o ffmpeg não estar instalado ou o
+        FFMPEG_HW_ENCODER não existir nesta máquina (ex: 'h264_v4l2m2m' fora
+        do Raspberry Pi).
+        
+        formato: Formato de gravação (de RECORDING_FORMATS)
+        ffmpeg_ausente: True se o programa ffmpeg não foi encontrado
+        """
+        if 'fourcc' in formato:
+            return
+        if ffmpeg_ausente:
+            motivo = f"o codificador '{FFMPEG_HW_ENCODER}' precisa do ffmpeg instalado (e no PATH)"
+        else:
+            motivo = f"verifique se o codificador '{FFMPEG_HW_ENCODER}' existe nesta máquina (FFMPEG_HW_ENCODER no config.py)"
+        print(f"AVISO ({self.cam_id}): H264_HW indisponível: {motivo}. Gravando em VP80 (WebM).")
+        if EVENT_LOGGING_AVAILABLE:
+            log_event(EventType.SYSTEM_ERROR, EventSeverity.WARNING,
+                     camera_id=self.cam_id,
+                     message=f"H264_HW indisponível: {motivo}; gravando em VP80 (WebM)")
+    
+    def _open_cv_writer(self, formato, fps, frame_size):
+        """
+        Cria um cv2.VideoWriter para o formato.
+        Formatos só de FFmpeg (H264_HW) passam a gravar em VP80 (WebM).
+        
+        formato: Formato de gravação (de RECORDING_FORMATS)
+        fps: Frames por segundo do vídeo
+        frame_size: (largura, altura) dos frames
+        
+        Retorna: (video_writer, nome_arquivo) - video_writer é None se não abrir
+        """
+        if 'fourcc' not in formato:
+            formato = RECORDING_FORMATS['VP80']
+        nome_arquivo = self._recording_filename(formato)
+        fourcc = cv2.VideoWriter_fourcc(*formato['fourcc'])
+        video_writer = cv2.VideoWriter(nome_arquivo, fourcc, fps, frame_size)
+        if not video_writer.isOpened():
+            print(f"ERRO ({self.cam_id}): O OpenCV não conseguiu abrir {nome_arquivo} para gravação.")
+            video_writer.release()
+            return None, nome_arquivo
+        return video_writer, nome_arquivo
+    
+    def _enqueue_frame(self, frame):
+        """
+        Coloca um frame na fila de gravação sem bloquear a captura.
+        Se a fila estiver cheia, descarta o frame MAIS ANTIGO para abrir espaço.
+        IMPORTANTE: Esta função deve ser chamada dentro de um 'with self.state_lock:'
+        """
+        try:
+            self.write_q.put_nowait(frame)
+        except queue.Full:
+            try:
+                self.write_q.get_nowait()  # Descarta o frame mais antigo
+            except queue.Empty:
+                pass
+            self.dropped_frames += 1
+            try:
+                self.write_q.put_nowait(frame)
+            except queue.Full:
+                pass
+    
+    def reset_motion_model(self):
+        """
+        Descarta os frames de referência e o modelo do fundo da detecção de movimento.
+        Eles são recalculados a partir dos próximos frames.
+        IMPORTANTE: Esta função deve ser chamada dentro de um 'with self.state_lock:'
+        """
+        self.prev1_gray = None
+        self.prev_thresh = None
+        self.prev_thresh_roi = None
+        self.motion_roi = None
+        self.last_motion_roi = None
+        self._roi_misses = 0
+        self._roi_box = None
+        self.bg_subtractor = self._create_bg_subtractor()
+        self.bg_ready = False
+        self._last_boxes = []
+    
+    def _create_bg_subtractor(self):
+        """
+        Cria um subtrator de fundo MOG2 novo (usado quando MOTION_ALGORITHM = 'MOG2').
+        
+        history: Quantos frames formam o modelo do fundo
+        varThreshold: Quanto um pixel precisa mudar para ser primeiro plano
+        detectShadows: False = sombras não são marcadas (mais rápido)
+        """
+        return cv2.createBackgroundSubtractorMOG2(history=500, varThreshold=16, detectShadows=False)
+    
+    def _detect_motion(self, frame):
+        """
+        Procura movimento no frame (veja _detect_motion_frame).
+        
+        Se o OpenCL der erro (driver com problema, memória da GPU cheia...),
+        desliga o OpenCL nesta câmera e continua pela CPU.
+        
+        frame: Frame original (numpy array BGR)
+        
+        Retorna: Lista de retângulos (x, y, w, h) com movimento,
+                 ou None se ainda não há frames anteriores suficientes
+        """
+        try:
+            return self._detect_motion_frame(frame)
+        except cv2.error as e:
+            if not self.use_opencl:
+                raise
+            print(f"AVISO ({self.cam_id}): Erro no OpenCL: {e}")
+            print(f"       A detecção de movimento ({self.cam_id}) vai usar a CPU.")
+            self.use_opencl = False
+            # As referências são UMat (do OpenCL): começa de novo com numpy
+            with self.state_lock:
+                self.reset_motion_model()
+            return None
+    
+    def _detect_motion_frame(self, frame):
+        """
+        Procura movimento no frame com o algoritmo escolhido em MOTION_ALGORITHM:
+        
+        - 'MOG2': compara com um modelo do fundo que se adapta aos poucos
+          (mudanças de iluminação não viram movimento). Veja _mog2_mask.
+        - 'DIFF3': diferença entre 3 frames seguidos. Veja _diff3_mask.
+        
+        Com OpenCL, as operações usam cv2.UMat (T-API do OpenCV) e rodam na
+        GPU integrada (Intel, Mali, VideoCore...).
+        
+        Tudo roda no frame reduzido para ~MOTION_HEIGHT pixels de altura; os
+        retângulos retornados já estão nas coordenadas do frame original.
+        
+        frame: Frame original (numpy array BGR)
+        
+        Retorna: Lista de retângulos (x, y, w, h) com movimento,
+                 ou None se ainda não há frames anteriores suficientes
+        """
+        altura, largura = frame.shape[:2]
+        if self._motion_frame_size != (altura, largura):
+            self._configure_motion_size(altura, largura)
+        s = self._motion_step
+        
+        if self.use_opencl:
+            # Envia o frame para o acelerador
+            # (o OpenCL reaproveita a memória dos UMat internamente)
+            src = cv2.UMat(frame)
+            
+            # Reduz o frame (INTER_NEAREST = pega 1 pixel a cada s, como na CPU)
+            if s > 1:
+                src = cv2.resize(src, (largura // s, altura // s), interpolation=cv2.INTER_NEAREST)
+            
+            # Converte o frame colorido para escala de cinza
+            # Isso facilita a comparação e é mais rápido
+            gray_frame = cv2.cvtColor(src, cv2.COLOR_BGR2GRAY)
+            
+            # Aplica um filtro de desfoque (blur) para reduzir ruído
+            # _blur_size = tamanho do kernel de desfoque (21x21 no frame original)
+            # Desfoque de média (box) em vez de Gaussiano: 3 a 5x mais rápido e
+            # suficiente para a detecção de movimento (que só precisa de blocos grandes)
+            gray_frame = cv2.boxFilter(gray_frame, -1, (self._blur_size, self._blur_size))
+        else:
+            # Alterna entre os dois buffers (o outro guarda as referências do frame anterior)
+            self._buf_idx ^= 1
+            
+            # Mesmas operações do caminho OpenCL, mas escrevendo nos buffers (dst=)
+            # A redução e a conversão para cinza são feitas juntas em uma passada
+            bgr_to_gray_down(frame, self._gray, s)
+            gray_frame = cv2.boxFilter(self._gray, -1, (self._blur_size, self._blur_size),
+                                       dst=self._blur_bufs[self._buf_idx])
+        
+        # Máscara de movimento (branco = movimento) e a posição dela no frame reduzido
+        altura_red, largura_red = altura // s, largura // s
+        if MOTION_ALGORITHM == 'MOG2':
+            motion_mask = self._mog2_mask(gray_frame)
+            origem = (0, 0)
+        else:
+            resultado = self._diff3_mask(gray_frame, largura_red, altura_red)
+            motion_mask, origem = resultado if resultado is not None else (None, None)
+        
+        # Ainda não há frames suficientes para comparar
+        if motion_mask is None:
+            return None
+        
+        # Encontra os contornos (blocos) de movimento na imagem
+        # offset = soma a origem da máscara para os contornos ficarem nas coordenadas do frame reduzido
+        contours, _ = cv2.findContours(motion_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE,
+                                       offset=origem)
+        
+        boxes = []
+        for contour in contours:
+            # Se a área for muito pequena, ignora (é apenas ruído)
+            if cv2.contourArea(contour) < self._min_area:
+                continue
+            
+            # Pega as coordenadas do retângulo que envolve o movimento
+            # x, y = canto superior esquerdo / w, h = largura e altura
+            boxes.append(cv2.boundingRect(contour))
+        
+        # A região de interesse só é usada pela diferença de 3 frames
+        # (o MOG2 precisa ver o frame inteiro para manter o modelo do fundo)
+        if MOTION_ROI_ENABLED and MOTION_ALGORITHM != 'MOG2':
+            self._update_motion_roi(boxes, largura_red, altura_red)
+        
+        # Multiplica por s para voltar às coordenadas do frame original
+        return [(x * s, y * s, w * s, h * s) for (x, y, w, h) in boxes]
+    
+    def _mog2_mask(self, gray_frame):
+        """
+        Calcula a máscara de movimento com o subtrator de fundo MOG2.
+        
+        O MOG2 guarda, para cada pixel, um modelo estatístico do fundo e
+        devolve a máscara de primeiro plano em uma única chamada (C++).
+        O fundo é atualizado devagar (learningRate=0.001), então mudanças
+        lentas de iluminação não são detectadas como movimento.
+        
+        gray_frame: Frame reduzido em cinza e desfocado (numpy ou UMat)
+        
+        Retorna: Máscara (numpy) com o movimento em branco,
+                 ou None no primeiro frame (quando o modelo é criado)
+        """
+        # Pega o subtrator de forma segura (reset_motion_model pode trocá-lo)
+        with self.state_lock:
+            bg_subtractor = self.bg_subtractor
+            primeiro_frame = not self.bg_ready
+            self.bg_ready = True
+        
+        if self.use_opencl:
+            # findContours precisa de numpy: .get() traz só a máscara binária de volta para a CPU
+            motion_mask = bg_subtractor.apply(gray_frame, learningRate=0.001).get()
+        else:
+            motion_mask = bg_subtractor.apply(gray_frame, fgmask=self._mask, learningRate=0.001)
+        
+        # No primeiro frame o modelo é criado e a máscara vem toda branca: ignora
+        if primeiro_frame:
+            print(f"DETECÇÃO ({self.cam_id}): Modelo do fundo criado.")
+            return None
+        return motion_mask
+    
+    def _diff3_mask(self, gray_frame, largura, altura):
+        """
+        Calcula a máscara de movimento pela diferença entre 3 frames seguidos.
+        
+        Compara o frame atual com o anterior (k, k-1) e o anterior com o
+        antes dele (k-1, k-2). Só é movimento o que mudou nas DUAS
+        comparações. Não precisa de um fundo estático (que fica errado quando
+        a iluminação muda). A comparação (k-1, k-2) é a mesma que foi feita
+        no frame anterior, então ela é reaproveitada em vez de recalculada.
+        
+        Sem OpenCL, a diferença e o limiar são feitos em uma única passada
+        por diff_thresh (Numba).
+        
+        Com MOTION_ROI_ENABLED, a diferença só é calculada na região onde
+        houve movimento no último frame (motion_roi), somada à região do frame
+        anterior (last_motion_roi). Assim a diferença (k-1, k-2) sempre cobre
+        o objeto, mesmo quando a região anda junto com ele.
+        
+        gray_frame: Frame reduzido em cinza e desfocado (numpy ou UMat)
+        largura, altura: Tamanho do frame reduzido
+        
+        Retorna: (máscara, (x0, y0)) - máscara numpy da região e o canto dela,
+                 ou None se ainda não há frames anteriores suficientes
+        """
+        # Pega as referências de forma segura
+        with self.state_lock:
+            prev1, prev_thresh = self.prev1_gray, self.prev_thresh
+            prev_roi = self.prev_thresh_roi
+            roi = self.motion_roi
+            last_roi = self.last_motion_roi
+        
+        # Região onde a diferença é calculada: (x0, y0, x1, y1) no frame reduzido
+        # Sem ROI, usa o frame inteiro
+        if roi is None:
+            roi = (0, 0, largura, altura)
+        if last_roi is None:
+            last_roi = roi
+        # União com a região do frame anterior (o retângulo que envolve as duas)
+        regiao = (min(roi[0], last_roi[0]), min(roi[1], last_roi[1]),
+                  max(roi[2], last_roi[2]), max(roi[3], last_roi[3]))
+        x0, y0, x1, y1 = regiao
+        
+        # Ainda não temos o frame anterior para comparar
+        if prev1 is None:
+            with self.state_lock:
+                self.prev1_gray = gray_frame
+            return None
+        
+        # Diferença entre os frames k e k-1 (só dentro da região)
+        # Pixels com diferença > 30 viram branco (movimento), resto fica preto
+        if self.use_opencl:
+            atual = cv2.UMat(gray_frame, (y0, y1), (x0, x1))
+            anterior = cv2.UMat(prev1, (y0, y1), (x0, x1))
+            # findContours precisa de numpy: .get() traz só a máscara binária da região para a CPU
+            thresh_atual = cv2.threshold(cv2.absdiff(atual, anterior), 30, 255, cv2.THRESH_BINARY)[1].get()
+        else:
+            thresh_atual = diff_thresh(gray_frame[y0:y1, x0:x1], prev1[y0:y1, x0:x1],
+                                       self._thresh_bufs[self._buf_idx][y0:y1, x0:x1], 30)
+        
+        # Gira as referências: o frame atual vira o anterior
+        # (o frame em cinza é sempre inteiro, porque a região do próximo frame pode ser outra)
+        with self.state_lock:
+            self.prev1_gray = gray_frame
+            self.prev_thresh = thresh_atual
+            self.prev_thresh_roi = regiao
+            self.last_motion_roi = roi
+        
+        # Ainda não temos a diferença (k-1, k-2)
+        if prev_thresh is None:
+            print(f"DETECÇÃO ({self.cam_id}): Frames de referência definidos.")
+            return None
+        
+        # Só é movimento o que mudou nas duas comparações
+        # A diferença anterior só existe dentro da região dela (prev_roi),
+        # então a comparação é feita na interseção das duas regiões
+        ix0, iy0 = max(x0, prev_roi[0]), max(y0, prev_roi[1])
+        ix1, iy1 = min(x1, prev_roi[2]), min(y1, prev_roi[3])
+        # A máscara é escrita no buffer já alocado (nos dois caminhos)
+        motion_mask = self._mask[y0:y1, x0:x1]
+        if (ix0, iy0, ix1, iy1) != regiao:
+            # Fora da interseção ainda não há as duas comparações: sem movimento
+            motion_mask.fill(0)
+        if ix1 > ix0 and iy1 > iy0:
+            np.bitwise_and(thresh_atual[iy0 - y0:iy1 - y0, ix0 - x0:ix1 - x0],
+                           prev_thresh[iy0 - prev_roi[1]:iy1 - prev_roi[1], ix0 - prev_roi[0]:ix1 - prev_roi[0]],
+                           out=motion_mask[iy0 - y0:iy1 - y0, ix0 - x0:ix1 - x0])
+        
+        return motion_mask, (x0, y0)
+    
+    def _configure_motion_size(self, altura, largura):
+        """
+        Calcula o tamanho do frame reduzido da detecção e aloca os buffers.
+        Chamada no primeiro frame e sempre que a resolução da câmera mudar.
+        
+        O fator de redução é inteiro (1 pixel a cada s), para a redução e a
+        conversão para cinza continuarem sendo uma única passada
+        (bgr_to_gray_down). Ex: 480 -> 160, 720 -> 180, 1080 -> 154.
+        
+        altura, largura: Tamanho do frame original
+        """
+        s = max(1, altura // MOTION_HEIGHT)
+        self._motion_frame_size = (altura, largura)
+        self._motion_step = s
+        
+        # O desfoque e a área mínima são reduzidos na mesma proporção do frame
+        # (o tamanho do kernel do desfoque precisa ser ímpar)
+        self._blur_size = max(3, (21 // s) | 1)
+        self._min_area = MIN_CONTOUR_AREA / (s * s)
+        
+        # Buffers do caminho da CPU (a máscara final também é usada com OpenCL)
+        tamanho = (altura // s, largura // s)
+        self._gray = np.empty(tamanho, np.uint8)
+        self._blur_bufs = [np.empty_like(self._gray), np.empty_like(self._gray)]
+        self._thresh_bufs = [np.empty_like(self._gray), np.empty_like(self._gray)]
+        self._mask = np.empty_like(self._gray)
+        
+        # As referências antigas têm outro tamanho: começa de novo
+        with self.state_lock:
+            self.reset_motion_model()
+    
+    def _update_motion_roi(self, boxes, largura, altura):
+        """
+        Atualiza a região de interesse (ROI) da detecção de movimento.
+        
+        A região é o retângulo que envolve todo o movimento encontrado, com
+        margem para o objeto poder se mover até o próximo frame: 20% do
+        tamanho, ou o tamanho do desfoque mais 2x o deslocamento do movimento
+        desde o frame anterior (a diferença de 3 frames acha o objeto com um
+        frame de atraso, e a borda da frente já está mais um frame adiante).
+        Se não houver movimento por MOTION_ROI_RESET_FRAMES frames seguidos,
+        volta a procurar no frame inteiro.
+        
+        Tudo é feito com o state_lock: reset_motion_model (chamada pelas rotas,
+        em outra thread) zera os mesmos campos.
+        
+        boxes: Retângulos (x, y, w, h) encontrados, no frame reduzido
+        largura, altura: Tamanho do frame reduzido
+        """
+        with self.state_lock:
+            # As referências foram descartadas depois desta detecção
+            # (reset_motion_model): os retângulos são de antes do reset
+            if self.prev1_gray is None:
+                return
+            
+            if boxes:
+                self._roi_misses = 0
+                bx0 = min(x for (x, y, w, h) in boxes)
+                by0 = min(y for (x, y, w, h) in boxes)
+                bx1 = max(x + w for (x, y, w, h) in boxes)
+                by1 = max(y + h for (x, y, w, h) in boxes)
+                # Deslocamento do movimento desde o frame anterior (0 no primeiro)
+                dx = dy = 0
+                if self._roi_box is not None:
+                    px0, py0, px1, py1 = self._roi_box
+                    dx = max(abs(bx0 - px0), abs(bx1 - px1))
+                    dy = max(abs(by0 - py0), abs(by1 - py1))
+                self._roi_box = (bx0, by0, bx1, by1)
+                # Margem mínima do tamanho do desfoque (ele espalha a diferença para os lados)
+                # mais o deslocamento esperado até o próximo frame
+                mx = max(int((bx1 - bx0) * 0.2), self._blur_size + 2 * dx)
+                my = max(int((by1 - by0) * 0.2), self._blur_size + 2 * dy)
+                roi = (max(0, bx0 - mx), max(0, by0 - my), min(largura, bx1 + mx), min(altura, by1 + my))
+            else:
+                self._roi_misses += 1
+                if self._roi_misses <= MOTION_ROI_RESET_FRAMES:
+                    return  # Mantém a região atual por mais alguns frames
+                roi = None
+                self._roi_box = None
+            
+            self.motion_roi = roi
+    
+    def _recording_fps(self):
+        """
+        Escolhe o FPS declarado no arquivo de gravação.
+        
+        Se o FPS do arquivo for diferente da quantidade de frames gravados por
+        segundo, o vídeo toca acelerado ou em câmera lenta. Por isso usa o FPS
+        medido pelo loop run() (cada frame processado vai para a gravação).
+        Enquanto ainda não há medição, usa o FPS informado pela fonte.
+        Valores sem sentido (0, NaN, acima de 240) viram 20 FPS.
+        
+        Retorna: FPS (float), entre 5 e 240
+        """
+        fps = self.stats['fps'] or self.source_fps
+        # fps != fps é verdadeiro só para NaN
+        if fps != fps or fps < 1 or fps > 240:
+            return 20.0
+        return float(max(5, round(fps)))
+    
     def start_recording_logic(self):
         """
         Função interna que INICIA a gravação de vídeo.
@@ -366,18 +1186,24 @@ class CameraWorker(threading.Thread):
         altura, largura, _ = frame.shape
         
         # FPS (frames por segundo) da gravação
-        fps = 20.0
-        
-        # Codec de vídeo (VP80 = formato WebM)
-        fourcc = cv2.VideoWriter_fourcc(*'VP80')
+        fps = self._recording_fps()
         
-        # Cria um nome único para o arquivo usando data e hora
-        timestr = time.strftime("%d-%m-%Y_%H%M%S")  # Exemplo: 25-12-2024_143022
-        # Nome do arquivo inclui o ID da câmera para identificar qual câmera gravou
-        nome_arquivo = f"{PASTA_GRAVACOES}/{self.cam_id}-gravacao-{timestr}.webm"
+        # Formato de gravação (codec + extensão do arquivo)
+        formato = RECORDING_FORMATS.get(RECORDING_CODEC, RECORDING_FORMATS['VP80'])
         
         # Cria o objeto que escreve o vídeo no arquivo
-        self.video_writer = cv2.VideoWriter(nome_arquivo, fourcc, fps, (largura, altura))
+        self.video_writer, nome_arquivo = self._open_video_writer(formato, fps, (largura, altura))
+        
+        # Inicia a thread que codifica e grava os frames da fila
+        # (os parâmetros vão junto para a troca de gravador em _writer_failed)
+        self.write_q = queue.Queue(maxsize=8)
+        self.dropped_frames = 0
+        self.writer_thread = threading.Thread(
+            target=self._writer_loop,
+            args=(self.video_writer, self.write_q, (formato, fps, (largura, altura))),
+            daemon=True
+        )
+        self.writer_thread.start()
         
         print(f"Salvando vídeo ({self.cam_id}) em: {nome_arquivo}")
         
@@ -392,25 +1218,43 @@ class CameraWorker(threading.Thread):
         """
         Função interna que PARA a gravação de vídeo.
         IMPORTANTE: Esta função deve ser chamada dentro de um 'with self.state_lock:'
+        
+        Só envia o sinal de parada: a thread de gravação termina de gravar os
+        frames pendentes e fecha o arquivo sozinha, depois que o lock é liberado.
+        
+        Retorna: A thread de gravação (quem precisar esperar o arquivo ser
+                 fechado chama join() FORA do lock), ou None se não estava gravando
         """
         # Se não está gravando, não faz nada
         if not self.is_recording:
-            return
+            return None
         
         print(f"LOG ({self.cam_id}): Parando gravação...")
         self.is_recording = False
         
-        # Se o video_writer existe, fecha e salva o arquivo
-        if self.video_writer is not None:
-            self.video_writer.release()  # Fecha o arquivo
-            self.video_writer = None  # Limpa a variável
-            print(f"Arquivo de vídeo ({self.cam_id}) salvo e fechado.")
-            
-            # Registra evento de parada de gravação
-            if EVENT_LOGGING_AVAILABLE:
-                log_event(EventType.RECORDING_STOPPED, EventSeverity.INFO,
-                         camera_id=self.cam_id,
-                         message=f"Gravação parada")
+        writer_thread, write_q = self.writer_thread, self.write_q
+        self.writer_thread = None
+        self.write_q = None
+        self.video_writer = None  # A thread de gravação fecha o arquivo
+        
+        # Envia o sinal de parada sem bloquear: se a fila estiver cheia,
+        # descarta o frame mais antigo (só esta função e _enqueue_frame colocam
+        # itens na fila, ambas com o lock, então depois disso sempre há espaço)
+        if write_q is not None:
+            try:
+                write_q.put_nowait(None)
+            except queue.Full:
+                try:
+                    write_q.get_nowait()
+                except queue.Empty:
+                    pass
+                self.dropped_frames += 1
+                write_q.put_nowait(None)
+        
+        if self.dropped_frames:
+            print(f"AVISO ({self.cam_id}): {self.dropped_frames} frame(s) descartado(s) na gravação (fila cheia).")
+        
+        return writer_thread
 
     def run(self):
         """
@@ -424,25 +1268,23 @@ class CameraWorker(threading.Thread):
         4. Se estiver gravando, salva o frame no arquivo
         5. Armazena o frame processado para transmissão ao vivo
         """
-        # Loop infinito - roda para sempre até o programa fechar
-        while True:
+        # Loop infinito - roda até o programa fechar (ou o release() pedir para parar)
+        while not self._parar.is_set():
             # Verifica se a câmera ainda está disponível
             if self.use_vlc:
                 # Verifica estado do player VLC
                 if self.vlc_player is None:
                     error_frame = create_no_camera_frame(self.cam_id)
-                    with self.frame_lock:
-                        self.output_frame = error_frame
-                    time.sleep(5)
+                    self._publish_frame(error_frame)
+                    self._parar.wait(5)
                     continue
                 # Verifica se está reproduzindo
                 state = self.vlc_player.get_state()
                 if state == vlc.State.Error or state == vlc.State.Ended:
                     print(f"({self.cam_id}): Erro no stream VLC. Tentando reconectar em 5s...")
                     error_frame = create_no_camera_frame(self.cam_id)
-                    with self.frame_lock:
-                        self.output_frame = error_frame
-                    time.sleep(5)
+                    self._publish_frame(error_frame)
+                    self._parar.wait(5)
                     # Tenta reiniciar
                     try:
                         self.vlc_player.stop()
@@ -457,17 +1299,18 @@ class CameraWorker(threading.Thread):
                     print(f"({self.cam_id}): Câmera não está aberta. Tentando reconectar em 5s...")
                     # Cria um frame informativo para exibir ao usuário
                     error_frame = create_no_camera_frame(self.cam_id)
-                    with self.frame_lock:
-                        self.output_frame = error_frame
-                    time.sleep(5)  # Espera 5 segundos
+                    self._publish_frame(error_frame)
+                    # Espera 5 segundos (ou até o release() pedir para parar)
+                    if self._parar.wait(5):
+                        break
                     # Tenta abrir a câmera novamente
-                    self.cap = cv2.VideoCapture(self.source)
-                    if isinstance(self.source, str) and self.source.lower().startswith('rtsp://'):
-                        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+                    self.cap = self._open_capture()
                     continue  # Volta para o início do loop
             
             # Lê um frame da câmera (via VLC ou OpenCV)
+            t0 = time.perf_counter()
             frame_original = self._read_frame()
+            self.stats['capture_ms'].append((time.perf_counter() - t0) * 1000)
             
             # Se não conseguiu ler o frame, mostra mensagem de erro
             if frame_original is None:
@@ -475,14 +1318,14 @@ class CameraWorker(threading.Thread):
                 # Cria um frame informativo para exibir ao usuário
                 error_frame = create_no_camera_frame(self.cam_id)
                 # Salva este frame como output para o stream
-                with self.frame_lock:
-                    self.output_frame = error_frame
-                time.sleep(1)  # Espera 1 segundo antes de tentar novamente
+                self._publish_frame(error_frame)
+                self._parar.wait(1)  # Espera 1 segundo antes de tentar novamente
                 continue  # Volta para o início do loop
             
-            # Cria uma cópia do frame para processar (adicionar retângulos de detecção)
             # frame_processado será o que aparece no stream (com retângulos verdes)
-            frame_processado = frame_original.copy()
+            # Começa sendo o próprio frame original: a cópia só é feita se algum
+            # retângulo for desenhado (sem movimento, não gasta uma cópia por frame)
+            frame_processado = frame_original
             
             # Flag para indicar se movimento foi detectado neste frame
             motion_detected_this_frame = False
@@ -491,6 +1334,9 @@ class CameraWorker(threading.Thread):
             objects_detected_this_frame = False
             detected_objects = []
             
+            # Momento atual (lido uma vez só, usado em todo o frame)
+            agora = time.time()
+            
             # Pega o estado da detecção de movimento (protegido pelo lock)
             with self.state_lock:
                 motion_is_on = self.motion_detection_enabled
@@ -499,90 +1345,43 @@ class CameraWorker(threading.Thread):
             # PROCESSAMENTO DE DETECÇÃO DE MOVIMENTO
             # ================================================================
             if motion_is_on:
-                # Converte o frame colorido para escala de cinza
-                # Isso facilita a comparação e é mais rápido
-                gray_frame = cv2.cvtColor(frame_original, cv2.COLOR_BGR2GRAY)
-                
-                # Aplica um filtro de desfoque (blur) para reduzir ruído
-                # (21, 21) = tamanho do kernel de desfoque
-                gray_frame = cv2.GaussianBlur(gray_frame, (21, 21), 0)
-                
-                # Acessa o fundo estático de forma segura
-                with self.state_lock:
-                    # Se ainda não temos um fundo estático, usa este frame como fundo
-                    if self.static_background is None:
-                        self.static_background = gray_frame
-                        print(f"DETECÇÃO ({self.cam_id}): Fundo estático definido.")
-                        # Pula este frame e vai para o próximo (precisa de mais frames para comparar)
-                        continue
-                    
-                    # Copia o fundo para não ficar travado no lock
-                    bg = self.static_background.copy()
-                
-                # Calcula a diferença entre o fundo e o frame atual
-                # Quanto maior a diferença, mais movimento há
-                diff_frame = cv2.absdiff(bg, gray_frame)
-                
-                # Converte a diferença em imagem binária (preto e branco)
-                # Pixels com diferença > 30 viram branco (movimento), resto fica preto
-                thresh_frame = cv2.threshold(diff_frame, 30, 255, cv2.THRESH_BINARY)[1]
-                
-                # Encontra os contornos (blocos) de movimento na imagem
-                contours, _ = cv2.findContours(thresh_frame, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-                
-                # Para cada contorno encontrado
-                for contour in contours:
-                    # Calcula a área do contorno (quantos pixels tem)
-                    area = cv2.contourArea(contour)
+                # Só procura movimento a cada DETECTION_STRIDE frames
+                # Nos outros frames, repete os retângulos da última detecção
+                # (assim eles não piscam no stream)
+                self._det_counter += 1
+                if self._det_counter % DETECTION_STRIDE == 0:
+                    # Procura movimento no frame (retorna os retângulos encontrados)
+                    t0 = time.perf_counter()
+                    motion_boxes = self._detect_motion(frame_original)
+                    self.stats['motion_ms'].append((time.perf_counter() - t0) * 1000)
                     
-                    # Se a área for muito pequena, ignora (é apenas ruído)
-                    if area < MIN_CONTOUR_AREA:
+                    # None = ainda não há frames anteriores suficientes para comparar
+                    # Pula este frame e vai para o próximo (precisa de mais frames para comparar)
+                    if motion_boxes is None:
                         continue
-                    
-                    # Se chegou aqui, é movimento real!
+                    self._last_boxes = motion_boxes
+                else:
+                    motion_boxes = self._last_boxes
+                
+                # Se encontrou algum retângulo, é movimento real!
+                if motion_boxes:
                     motion_detected_this_frame = True
                     
-                    # Pega as coordenadas do retângulo que envolve o movimento
-                    (x, y, w, h) = cv2.boundingRect(contour)
-                    # x, y = canto superior esquerdo
-                    # w, h = largura e altura
+                    # Copia o frame antes de desenhar (o original vai limpo para a gravação)
+                    # A cópia vai para um buffer já alocado do anel (não aloca um frame novo)
+                    frame_processado = self._next_ring_buffer(frame_original)
                     
-                    # Desenha um retângulo verde no frame processado
+                    # Desenha todos os retângulos verdes no frame processado de uma vez
                     # (0, 255, 0) = cor verde em BGR
                     # 2 = espessura da linha
-                    cv2.rectangle(frame_processado, (x, y), (x + w, y + h), (0, 255, 0), 2)
-                
-                # ============================================================
-                # LÓGICA DE GRAVAÇÃO AUTOMÁTICA POR MOVIMENTO
-                # ============================================================
-                with self.state_lock:
-                    if motion_detected_this_frame:
-                        # Movimento detectado! Atualiza o timestamp
-                        self.last_motion_time = time.time()
-                        
-                        # Se não está gravando, inicia a gravação
-                        if not self.is_recording:
-                            print(f"DETECÇÃO ({self.cam_id}): Movimento detectado! Iniciando gravação...")
-                            # Registra evento de detecção de movimento
-                            if EVENT_LOGGING_AVAILABLE:
-                                log_event(EventType.MOTION_DETECTED, EventSeverity.INFO,
-                                         camera_id=self.cam_id,
-                                         message=f"Movimento detectado - iniciando gravação automática")
-                            self.start_recording_logic()
-                    else:
-                        # Não há movimento neste frame
-                        # Se está gravando E já passou o tempo de cooldown, para a gravação
-                        tempo_sem_movimento = time.time() - self.last_motion_time
-                        if self.is_recording and tempo_sem_movimento > MOTION_COOLDOWN:
-                            print(f"DETECÇÃO ({self.cam_id}): Sem movimento por {MOTION_COOLDOWN}s. Parando gravação...")
-                            self.stop_recording_logic()
+                    draw_boxes(frame_processado, motion_boxes, (0, 255, 0), 2)
             
             # ================================================================
             # DETECÇÃO DE OBJETOS (IA)
             # ================================================================
             # Processa detecção de objetos se estiver ativada
             # (processa a cada X segundos para não sobrecarregar o sistema)
-            current_time = time.time()
+            current_time = agora
             if (self.object_detection_enabled and 
                 self.object_detector is not None and
                 current_time - self.last_detection_time >= self.detection_interval):
@@ -648,27 +1447,81 @@ class CameraWorker(threading.Thread):
                                  camera_id=self.cam_id,
                                  message=f"Erro na detecção de objetos: {str(e)}")
     
-            # ================================================================
-            # GRAVAÇÃO DE VÍDEO (Manual ou Automática)
-            # ================================================================
+            # Um único lock para a gravação automática e para a gravação do frame
             with self.state_lock:
-                # Se está gravando, salva o frame no arquivo
-                if self.is_recording and self.video_writer is not None:
-                    try:
-                        # Salva o frame ORIGINAL (sem retângulos) no arquivo
-                        # Isso garante que o vídeo gravado seja limpo
-                        self.video_writer.write(frame_original)
-                    except cv2.error:
-                        # Se der erro (arquivo foi fechado), ignora
-                        pass
+                # ============================================================
+                # LÓGICA DE GRAVAÇÃO AUTOMÁTICA POR MOVIMENTO
+                # ============================================================
+                if motion_is_on:
+                    if motion_detected_this_frame:
+                        # Movimento detectado! Atualiza o timestamp
+                        self.last_motion_time = agora
+                        
+                        # Se não está gravando, inicia a gravação
+                        if not self.is_recording:
+                            print(f"DETECÇÃO ({self.cam_id}): Movimento detectado! Iniciando gravação...")
+                            # Registra evento de detecção de movimento
+                            if EVENT_LOGGING_AVAILABLE:
+                                log_event(EventType.MOTION_DETECTED, EventSeverity.INFO,
+                                         camera_id=self.cam_id,
+                                         message=f"Movimento detectado - iniciando gravação automática")
+                            self.start_recording_logic()
+                    else:
+                        # Não há movimento neste frame
+                        # Se está gravando E já passou o tempo de cooldown, para a gravação
+                        tempo_sem_movimento = agora - self.last_motion_time
+                        if self.is_recording and tempo_sem_movimento > MOTION_COOLDOWN:
+                            print(f"DETECÇÃO ({self.cam_id}): Sem movimento por {MOTION_COOLDOWN}s. Parando gravação...")
+                            self.stop_recording_logic()
+                
+                # ============================================================
+                # GRAVAÇÃO DE VÍDEO (Manual ou Automática)
+                # ============================================================
+                # Se está gravando, envia o frame para a fila da thread de gravação
+                if self.is_recording and self.write_q is not None:
+                    # Envia o frame ORIGINAL (sem retângulos) para o arquivo
+                    # Isso garante que o vídeo gravado seja limpo
+                    # Não precisa copiar: frame_original nunca é modificado depois daqui
+                    self._enqueue_frame(frame_original)
             
             # ================================================================
             # ARMAZENAMENTO DO FRAME PARA STREAM AO VIVO
             # ================================================================
-            with self.frame_lock:
-                # Salva o frame PROCESSADO (com retângulos, se houver) para o stream
-                # Este é o frame que aparece na interface web
-                self.output_frame = frame_processado
+            # Salva o frame PROCESSADO (com retângulos, se houver) para o stream
+            # Este é o frame que aparece na interface web
+            self._publish_frame(frame_processado)
+            
+            # Atualiza o FPS uma vez por segundo
+            self._fps_frames += 1
+            t_fps = time.perf_counter()
+            if t_fps - self._fps_start >= 1.0:
+                self.stats['fps'] = self._fps_frames / (t_fps - self._fps_start)
+                self._fps_frames = 0
+                self._fps_start = t_fps
+    
+    def get_metrics(self):
+        """
+        Retorna as métricas de desempenho da câmera.
+        Cada etapa aparece como a média (em ms) das últimas 100 medições.
+        
+        Retorna: Dicionário com as métricas
+        """
+        metrics = {}
+        for nome, valor in self.stats.items():
+            if isinstance(valor, deque):
+                # Copia antes de somar (outra thread pode estar adicionando medições)
+                medidas = list(valor)
+                valor = round(sum(medidas) / len(medidas), 2) if medidas else None
+            else:
+                valor = round(valor, 1)
+            metrics[nome] = valor
+        metrics['dropped'] = self.dropped_frames
+        
+        # Frames esperando na fila da thread de gravação (0 se não está gravando)
+        # Fila sempre cheia = o codificador não está dando conta do FPS da câmera
+        write_q = self.write_q
+        metrics['write_queue'] = write_q.qsize() if write_q is not None else 0
+        return metrics
     
     def get_detection_stats(self):
         """
@@ -691,10 +1544,18 @@ class CameraWorker(threading.Thread):
         Função para limpar recursos quando o servidor for fechado.
         Fecha a câmera e para qualquer gravação em andamento.
         """
+        # Pede para o loop run() parar e espera ele terminar o frame atual
+        # (senão ele poderia ler da câmera já fechada e tentar reconectar)
+        self._parar.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout=2.0)
+        
         # Para a gravação se estiver gravando
         with self.state_lock:
-            if self.is_recording:
-                self.stop_recording_logic()
+            writer_thread = self.stop_recording_logic()
+        # Espera o arquivo ser fechado (fora do lock) antes do programa terminar
+        if writer_thread is not None:
+            writer_thread.join(timeout=15)
         
         # Fecha a câmera (VLC ou OpenCV)
         if self.use_vlc and self.vlc_player:
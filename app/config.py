@@ -28,6 +28,25 @@ CAMERA_SOURCES = {
 # Nome da pasta onde os vídeos serão salvos
 PASTA_GRAVACOES = "gravacoes"
 
+# Extensões dos arquivos de vídeo da pasta de gravações
+# (gravações em qualquer formato de RECORDING_CODEC e vídeos convertidos)
+VIDEO_EXTENSIONS = ('.webm', '.mp4', '.avi', '.mov')
+
+# Codec usado nas gravações
+# - 'VP80': WebM (.webm) - padrão, toca em qualquer navegador, mas pesa na CPU
+# - 'MJPG': Motion JPEG (.avi) - cerca de 10x mais leve para a CPU, arquivos maiores
+#           (ATENÇÃO: navegadores não tocam .avi; para assistir no player da página,
+#           converta o vídeo para WebM/MP4 na tela de exportação ou baixe o arquivo)
+# - 'H264_HW': H.264 (.mp4) via FFmpeg com codificador de hardware (precisa do ffmpeg instalado)
+RECORDING_CODEC = 'VP80'
+
+# Codificador do FFmpeg usado quando RECORDING_CODEC = 'H264_HW'
+# Exemplos: 'h264_v4l2m2m' (Raspberry Pi), 'h264_nvenc' (NVIDIA), 'h264_qsv' (Intel),
+#           'libx264' (software, sem placa de vídeo)
+# Se o FFmpeg não tiver esse codificador (ex: 'h264_v4l2m2m' fora do Raspberry Pi),
+# a gravação continua em VP80 (WebM) com o OpenCV e um aviso aparece no log
+FFMPEG_HW_ENCODER = 'h264_v4l2m2m'
+
 # ============================================================================
 # CONFIGURAÇÕES DE DETECÇÃO DE MOVIMENTO
 # ============================================================================
@@ -40,6 +59,89 @@ MOTION_COOLDOWN = 5.0
 # Valores menores = mais sensível, valores maiores = menos sensível
 MIN_CONTOUR_AREA = 500
 
+# Altura (em pixels) do frame reduzido usado na detecção de movimento
+# O frame é reduzido antes da detecção (1080p vira ~150p, ~50x menos pixels)
+# A área mínima e os retângulos são ajustados automaticamente para o frame original
+MOTION_HEIGHT = 150
+
+# Procura movimento só a cada N frames (1 = todos os frames)
+# Um objeto não atravessa a imagem em 50 ms, então 2 = metade do trabalho
+# sem diferença perceptível (nos frames pulados, repete os últimos retângulos)
+DETECTION_STRIDE = 2
+
+# Usa OpenCL (GPU integrada ou placa de vídeo) na detecção de movimento, se disponível
+# Tira o trabalho pesado (desfoque) dos núcleos da CPU usados pelo Flask
+# False = sempre usa a CPU
+ACCELERATE = True
+
+# Algoritmo da detecção de movimento
+# 'MOG2'  = compara com um modelo do fundo que se adapta à iluminação
+#           (menos alarmes falsos, menos gravações desnecessárias)
+# 'DIFF3' = diferença entre 3 frames seguidos (mais leve, não usa modelo do fundo)
+MOTION_ALGORITHM = 'MOG2'
+
+# Procura movimento só perto de onde ele foi visto por último (região de interesse)
+# Usado apenas com MOTION_ALGORITHM = 'DIFF3'
+# Em cenas de vigilância o movimento ocupa uma parte pequena do frame,
+# então isso reduz bastante o trabalho por frame
+MOTION_ROI_ENABLED = True
+
+# Quantos frames seguidos sem movimento na região antes de voltar a
+# procurar no frame inteiro
+MOTION_ROI_RESET_FRAMES = 10
+
+# ============================================================================
+# CONFIGURAÇÕES DO STREAM AO VIVO
+# ============================================================================
+
+# Qualidade do JPEG enviado para os navegadores (0 a 100)
+# O JPEG é codificado uma vez por frame e enviado para todos os clientes
+# Valores maiores = imagem melhor, mas mais CPU e mais banda de rede
+STREAM_JPEG_QUALITY = 80
+
+# Largura máxima (em pixels) do frame enviado para os navegadores
+# Frames mais largos são reduzidos antes de codificar o JPEG (a gravação não muda)
+# 1080p vira 720p: menos da metade dos pixels para codificar e enviar
+# None = envia no tamanho original
+STREAM_MAX_WIDTH = 1280
+
+# ============================================================================
+# CONFIGURAÇÕES DO SERVIDOR WEB
+# ============================================================================
+
+# Número de threads do servidor Waitress (usado no modo HTTP, se instalado)
+# Cada navegador assistindo o stream ao vivo ocupa uma thread enquanto assiste,
+# então este valor limita quantas pessoas podem assistir ao mesmo tempo
+# (as outras requisições esperam uma thread ficar livre)
+SERVER_THREADS = 32
+
+# Número máximo de conexões abertas ao mesmo tempo no Waitress
+SERVER_CONNECTION_LIMIT = 200
+
+# Núcleos da CPU em que o servidor pode rodar (None = todos, o sistema decide)
+# Em processadores híbridos (Intel com núcleos P/E, ARM big.LITTLE), as threads
+# das câmeras podem cair nos núcleos lentos. Informe aqui os núcleos rápidos.
+# Exemplo: {0, 1, 2, 3} (a numeração dos núcleos rápidos muda de um processador
+# para outro: confira com lscpu no Linux ou no Gerenciador de Tarefas no Windows)
+CPU_AFFINITY = None
+
+# Prefixo do X-Accel-Redirect para o player de gravações (nginx na frente do servidor)
+# None = o próprio Flask envia o arquivo (padrão)
+# Com o nginx, o Flask só confere o login e o nginx envia o arquivo com sendfile()
+# (sem passar os bytes pelo Python). Exemplo de configuração no nginx:
+#     location /protected_gravacoes/ {
+#         internal;
+#         alias /caminho/do/projeto/gravacoes/;
+#     }
+# e aqui: PLAYBACK_ACCEL_REDIRECT = '/protected_gravacoes/'
+PLAYBACK_ACCEL_REDIRECT = None
+
+# Tempo (em segundos) que o resultado da leitura da pasta de gravações é
+# reaproveitado pelas estatísticas do dashboard
+# Com milhares de gravações, ler o tamanho e a data de cada arquivo demora;
+# assim, várias abas do dashboard abertas não leem a pasta toda hora
+STATS_CACHE_SECONDS = 10
+
 # ============================================================================
 # CONFIGURAÇÕES DE DETECÇÃO DE OBJETOS (IA)
 # ============================================================================
@@ -10,6 +10,7 @@ Este arquivo contém todas as funções relacionadas ao banco de dados MySQL:
 """
 
 import os
+import threading
 from datetime import datetime
 from contextlib import contextmanager
 from dotenv import load_dotenv
@@ -31,9 +32,53 @@ DB_USER = os.getenv('DB_USER')
 DB_PASSWORD = os.getenv('DB_PASSWORD')
 
 
+# Indica se as tabelas já foram criadas/verificadas nesta execução
+# O banco não é inicializado antes das câmeras (servidor.py verifica em segundo
+# plano), então elas começam sem esperar pelo MySQL
+_tabelas_prontas = False
+_init_tentado = False  # True depois da primeira tentativa (mesmo se falhou)
+_init_lock = threading.Lock()
+
+
+def garantir_tabelas():
+    """
+    Cria/verifica as tabelas (init_database) uma única vez por execução.
+    
+    Se o MySQL estiver fora do ar, o aviso aparece uma vez só e a criação
+    não é tentada de novo a cada conexão (cada tentativa esperaria o tempo
+    limite de conexão).
+    
+    Retorna: True se as tabelas estão prontas
+    """
+    global _tabelas_prontas, _init_tentado
+    if not _init_tentado:
+        with _init_lock:
+            if not _init_tentado:
+                try:
+                    init_database()
+                    _tabelas_prontas = True
+                except Exception as e:
+                    print(f"AVISO: Erro ao inicializar banco de dados: {e}")
+                    print("Continuando com armazenamento JSON (legado)...")
+                finally:
+                    _init_tentado = True
+    return _tabelas_prontas
+
+
 def get_db_connection():
     """
     Cria uma conexão com o banco de dados MySQL.
+    Na primeira vez, cria as tabelas necessárias (garantir_tabelas).
+    
+    Retorna: Objeto de conexão com o banco de dados
+    """
+    garantir_tabelas()
+    return _conectar()
+
+
+def _conectar():
+    """
+    Abre a conexão com o MySQL (sem verificar as tabelas).
     
     Retorna: Objeto de conexão com o banco de dados
     """
@@ -56,8 +101,10 @@ def init_database():
     """
     Inicializa o banco de dados criando as tabelas necessárias.
     Se as tabelas já existirem, não faz nada.
+    É chamada uma única vez por garantir_tabelas (ao iniciar o servidor ou
+    na primeira conexão).
     """
-    conn = get_db_connection()
+    conn = _conectar()
     cursor = conn.cursor()
     
     try:
@@ -6,11 +6,11 @@ LOGGER DE EVENTOS
 Este módulo registra todos os eventos importantes do sistema VMS.
 """
 
-import json
 import os
 from datetime import datetime
 from threading import Lock
 from enum import Enum
+from app import json_io
 
 # Arquivo onde os eventos serão salvos
 EVENTS_LOG_FILE = 'logs/events_log.json'
@@ -53,8 +53,8 @@ def _load_events():
             return []
         
         try:
-            with open(EVENTS_LOG_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open(EVENTS_LOG_FILE, 'rb') as f:
+                return json_io.loads(f.read())
         except Exception as e:
             print(f"Erro ao carregar eventos: {e}")
             return []
@@ -71,8 +71,9 @@ def _save_events(events):
             if len(events) > MAX_EVENTS:
                 events = events[-MAX_EVENTS:]
             
-            with open(EVENTS_LOG_FILE, 'w', encoding='utf-8') as f:
-                json.dump(events, f, indent=2, ensure_ascii=False)
+            # O arquivo inteiro é reescrito a cada evento (usa o orjson, se instalado)
+            with open(EVENTS_LOG_FILE, 'wb') as f:
+                f.write(json_io.dumps(events))
             return True
         except Exception as e:
             print(f"Erro ao salvar eventos: {e}")
@@ -0,0 +1,50 @@
+"""
+================================================================================
+JSON IO - Leitura e escrita rápidas de arquivos JSON
+================================================================================
+
+Este arquivo contém as funções usadas para ler e escrever os arquivos JSON
+do sistema (configurações e log de eventos).
+
+Se o orjson estiver instalado, ele é usado (escrito em Rust, converte
+JSON várias vezes mais rápido). Caso contrário, usa o módulo json padrão.
+O log de eventos é lido e reescrito inteiro a cada evento, então aqui
+a diferença aparece.
+"""
+
+import json
+
+# Importa o orjson (opcional)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    print("AVISO: orjson não disponível. Instale: pip install orjson")
+    print("       Os arquivos JSON vão usar o módulo json padrão (mais lento).")
+
+
+def loads(dados):
+    """
+    Converte o conteúdo de um arquivo JSON em objetos Python.
+
+    dados: bytes do arquivo (UTF-8)
+
+    Retorna: O objeto (dicionário, lista, ...)
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(dados)
+    return json.loads(dados)
+
+
+def dumps(obj):
+    """
+    Converte um objeto Python em JSON indentado (2 espaços), pronto para salvar.
+
+    obj: Objeto a converter
+
+    Retorna: bytes (UTF-8) do JSON
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
@@ -0,0 +1,152 @@
+"""
+================================================================================
+MOTION - Funções rápidas para a detecção de movimento
+================================================================================
+
+Este arquivo contém as funções de processamento de pixels usadas pela
+detecção de movimento do CameraWorker.
+
+Se o Numba estiver instalado, as funções são compiladas para código de
+máquina (com SIMD - AVX2/NEON). Caso contrário, usam as funções
+equivalentes do OpenCV.
+
+As funções compiladas liberam o GIL (nogil=True): cada câmera roda na sua
+própria thread, então várias câmeras processam frames ao mesmo tempo, em
+núcleos diferentes. Elas não usam threads internas (parallel=True), porque
+o frame reduzido é pequeno e a camada de threads padrão do Numba
+(workqueue) derruba o programa quando duas threads a usam ao mesmo tempo.
+"""
+
+import cv2
+import numpy as np
+
+# Importa o Numba (opcional)
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    print("AVISO: Numba não disponível. Instale: pip install numba")
+    print("       A detecção de movimento vai usar apenas o OpenCV.")
+
+
+if NUMBA_AVAILABLE:
+    @njit(nogil=True, fastmath=True, cache=True)
+    def _diff_thresh_numba(a, b, out, thr):
+        for i in range(a.shape[0]):
+            for j in range(a.shape[1]):
+                d = np.int16(a[i, j]) - np.int16(b[i, j])
+                if d < 0:
+                    d = -d
+                out[i, j] = 255 if d > thr else 0
+
+    @njit(nogil=True, cache=True)
+    def _bgr_to_gray_down_numba(src, out, s):
+        for i in range(out.shape[0]):
+            for j in range(out.shape[1]):
+                b = np.int32(src[i * s, j * s, 0])
+                g = np.int32(src[i * s, j * s, 1])
+                r = np.int32(src[i * s, j * s, 2])
+                # Pesos 0.114 / 0.587 / 0.299 em ponto fixo (x256)
+                out[i, j] = (29 * b + 150 * g + 77 * r) >> 8
+
+    @njit(nogil=True, cache=True)
+    def _fill_span(img, y, inicio, fim, b, g, r):
+        # Pinta a linha y de inicio a fim (inclusive), recortada para dentro da imagem
+        inicio = max(inicio, 0)
+        fim = min(fim, img.shape[1] - 1)
+        for x in range(inicio, fim + 1):
+            img[y, x, 0] = b
+            img[y, x, 1] = g
+            img[y, x, 2] = r
+
+    @njit(nogil=True, cache=True)
+    def _draw_boxes_numba(img, boxes, b, g, r, t):
+        altura = img.shape[0]
+        # Mesma geometria do cv2.rectangle: a linha fica centrada na borda,
+        # com meia espessura h para cada lado e cantos arredondados (raio h)
+        h = 0 if t <= 1 else (t + 1) // 2
+        for k in range(boxes.shape[0]):
+            x0 = boxes[k, 0]
+            y0 = boxes[k, 1]
+            x1 = x0 + boxes[k, 2]
+            y1 = y0 + boxes[k, 3]
+            for y in range(max(y0 - h, 0), min(y1 + h, altura - 1) + 1):
+                if y < y0 + h + 1 or y > y1 - h - 1:
+                    # Linha de cima ou de baixo: pinta a linha inteira
+                    # (fora do retângulo, só até onde o canto arredondado alcança)
+                    dy = y0 - y if y < y0 else (y - y1 if y > y1 else 0)
+                    e = h
+                    while e > 0 and e * e + dy * dy > h * h:
+                        e -= 1
+                    _fill_span(img, y, x0 - e, x1 + e, b, g, r)
+                else:
+                    # Laterais: pinta só as bordas da esquerda e da direita
+                    _fill_span(img, y, x0 - h, x0 + h, b, g, r)
+                    _fill_span(img, y, x1 - h, x1 + h, b, g, r)
+
+def diff_thresh(a, b, out, thr):
+    """
+    Calcula |a - b| > thr em uma única passada e escreve a máscara em out.
+
+    Equivale a cv2.absdiff seguido de cv2.threshold, mas sem criar a imagem
+    intermediária da diferença (metade dos bytes lidos/escritos na memória).
+
+    a, b: Imagens em cinza (uint8) do mesmo tamanho
+    out: Imagem uint8 já alocada, com o mesmo tamanho, que recebe a máscara
+    thr: Diferença mínima para o pixel virar branco (255)
+
+    Retorna: out
+    """
+    if NUMBA_AVAILABLE:
+        _diff_thresh_numba(a, b, out, thr)
+    else:
+        cv2.absdiff(a, b, dst=out)
+        cv2.threshold(out, thr, 255, cv2.THRESH_BINARY, dst=out)
+    return out
+
+
+def bgr_to_gray_down(src, out, s):
+    """
+    Reduz o frame (pegando 1 pixel a cada s) e converte para cinza em uma única passada.
+
+    Cada pixel BGR usado é lido uma vez só e o cinza é escrito direto em out,
+    sem criar a imagem reduzida intermediária.
+
+    src: Frame colorido (BGR, uint8)
+    out: Imagem uint8 já alocada com tamanho (altura // s, largura // s)
+    s: Fator de redução (1 = tamanho original)
+
+    Retorna: out
+    """
+    if NUMBA_AVAILABLE:
+        _bgr_to_gray_down_numba(src, out, s)
+    else:
+        altura, largura = out.shape
+        cv2.cvtColor(src[:altura * s:s, :largura * s:s], cv2.COLOR_BGR2GRAY, dst=out)
+    return out
+
+
+def draw_boxes(img, boxes, color, thickness):
+    """
+    Desenha o contorno de vários retângulos no frame de uma vez só.
+
+    Com o Numba, todos os retângulos são desenhados em uma única chamada,
+    em vez de uma chamada de cv2.rectangle (com as verificações dela) por retângulo.
+    O desenho é igual pixel a pixel ao do cv2.rectangle (linha centrada na
+    borda, cantos arredondados, recortada nas bordas da imagem), então o
+    vídeo ao vivo fica igual com ou sem o Numba.
+
+    img: Frame colorido (BGR, uint8) onde os retângulos são desenhados
+    boxes: Lista de retângulos (x, y, w, h)
+    color: Cor (B, G, R)
+    thickness: Espessura da linha em pixels
+    """
+    if not boxes:
+        return
+    if NUMBA_AVAILABLE:
+        b, g, r = color
+        _draw_boxes_numba(img, np.asarray(boxes, dtype=np.int32), b, g, r, thickness)
+    else:
+        for (x, y, w, h) in boxes:
+            cv2.rectangle(img, (x, y), (x + w, y + h), color, thickness)
@@ -7,10 +7,12 @@ Este arquivo contém todas as rotas (endpoints) da API Flask.
 Cada rota é uma função que responde a requisições HTTP específicas.
 """
 
-from flask import render_template, jsonify, send_from_directory, Response, request
+from flask import render_template, jsonify, send_from_directory, Response, request, abort
+from werkzeug.security import safe_join
 
 # Importa as configurações e módulos necessários
-from app.config import PASTA_GRAVACOES, g_cameras
+from app.config import PASTA_GRAVACOES, PLAYBACK_ACCEL_REDIRECT, VIDEO_EXTENSIONS, RECORDING_CODEC, g_cameras
+from app.camera_worker import RECORDING_FORMATS
 from app.video_stream import gerar_frames
 from app.auth import login_required, get_current_user, role_required, permission_required, get_user_role, user_has_permission
 from app.camera_manager import (
@@ -26,7 +28,21 @@ from app.video_converter import (
     convert_video, extract_frames, get_video_info,
     SUPPORTED_FORMATS
 )
+import copy
 import os
+import threading
+from urllib.parse import quote
+
+
+# Cache da lista de vídeos da pasta de gravações
+# Só lê a pasta de novo quando a data de modificação (mtime) dela muda,
+# ou seja, quando um arquivo é criado, renomeado ou apagado
+# Guarda a resposta já convertida para JSON (bytes), pronta para enviar
+_video_cache = {'mtime': None, 'json': b''}
+
+# Lock do cache: se várias requisições chegam logo depois de a pasta mudar,
+# só a primeira lê a pasta de novo (as outras esperam e usam o resultado dela)
+_video_cache_lock = threading.Lock()
 
 
 def registrar_rotas(app):
@@ -124,8 +140,11 @@ def registrar_rotas(app):
         Retorna: Stream de vídeo MJPEG
         """
         # Cria uma resposta de streaming usando a função gerar_frames
+        # direct_passthrough: o Werkzeug repassa cada parte direto para o socket,
+        # sem passar por um iterador extra que confere/converte cada bloco
         return Response(gerar_frames(cam_id),
-                        mimetype='multipart/x-mixed-replace; boundary=frame')
+                        mimetype='multipart/x-mixed-replace; boundary=frame',
+                        direct_passthrough=True)
     
     # ============================================================================
     # ROTAS DE CONTROLE DE GRAVAÇÃO
@@ -231,8 +250,8 @@ def registrar_rotas(app):
             is_enabled = worker.motion_detection_enabled
             
             if is_enabled:
-                # Se ativou, reseta o fundo estático (vai recalcular no próximo frame)
-                worker.static_background = None
+                # Se ativou, descarta os frames de referência (vai recalcular nos próximos frames)
+                worker.reset_motion_model()
                 status_msg = f"Detecção Ativada ({cam_id})"
             else:
                 # Se desativou, para qualquer gravação automática em andamento
@@ -330,6 +349,25 @@ def registrar_rotas(app):
         
         return jsonify(stats)
     
+    @app.route('/metrics/<cam_id>')
+    @login_required  # Protege a rota - requer login
+    def get_metrics(cam_id):
+        """
+        Retorna as métricas de desempenho de uma câmera.
+        Mostra o tempo médio de cada etapa (captura, movimento, JPEG, gravação),
+        o FPS, quantos frames foram descartados na gravação e quantos
+        estão esperando na fila da thread de gravação.
+        
+        cam_id: ID da câmera
+        
+        Retorna: JSON com as métricas
+        """
+        # Verifica se a câmera existe
+        if cam_id not in g_cameras:
+            return jsonify(error="Câmera não encontrada"), 404
+        
+        return jsonify(g_cameras[cam_id].get_metrics())
+    
     # ============================================================================
     # ROTAS DO PLAYER DE VÍDEO (Para assistir gravações)
     # ============================================================================
@@ -343,26 +381,33 @@ def registrar_rotas(app):
         
         Retorna: JSON com lista de nomes de arquivos de vídeo
         """
-        videos = []
-        
         # Verifica se a pasta de gravações existe
-        if os.path.exists(PASTA_GRAVACOES):
-            # Lista todos os arquivos na pasta
-            arquivos = os.listdir(PASTA_GRAVACOES)
-            
-            # Formatos de vídeo suportados
-            video_extensions = ['.webm', '.mp4', '.avi', '.mov']
-            
-            # Filtra apenas arquivos de vídeo (incluindo convertidos)
-            videos = [f for f in arquivos if any(f.lower().endswith(ext) for ext in video_extensions)]
-            
-            # Remove pastas (como pastas de frames extraídos)
-            videos = [f for f in videos if os.path.isfile(os.path.join(PASTA_GRAVACOES, f))]
-            
-            # Ordena por nome (mais recentes primeiro, se o nome tiver timestamp)
-            videos = sorted(videos, reverse=True)
+        try:
+            mtime = os.stat(PASTA_GRAVACOES).st_mtime_ns
+        except FileNotFoundError:
+            return jsonify(videos=[])
+        
+        # Se a pasta mudou desde a última leitura, lê de novo
+        with _video_cache_lock:
+            if mtime != _video_cache['mtime']:
+                # os.scandir já traz o tipo de cada entrada junto com o nome,
+                # então não precisa de uma chamada extra por arquivo para saber se é pasta
+                # Filtra apenas arquivos de vídeo (incluindo convertidos) e ignora pastas
+                # (como pastas de frames extraídos)
+                with os.scandir(PASTA_GRAVACOES) as entradas:
+                    videos = [e.name for e in entradas
+                              if e.name.lower().endswith(VIDEO_EXTENSIONS) and e.is_file()]
+                
+                # Ordena por nome (mais recentes primeiro, se o nome tiver timestamp)
+                videos.sort(reverse=True)
+                
+                # Converte para JSON uma vez só (as próximas requisições reusam os bytes)
+                _video_cache['json'] = app.json.dumps({'videos': videos}).encode('utf-8')
+                _video_cache['mtime'] = mtime
         
-        return jsonify(videos=videos)
+            corpo = _video_cache['json']
+        
+        return Response(corpo, mimetype='application/json')
     
     @app.route('/playback/<filename>')
     @login_required  # Protege a rota - requer login
@@ -375,7 +420,20 @@ def registrar_rotas(app):
         
         Retorna: Arquivo de vídeo para o navegador
         """
+        # Com o nginx na frente: só confere o arquivo e deixa o nginx enviar
+        # (sendfile direto do disco para o socket, sem passar pelo Python)
+        if PLAYBACK_ACCEL_REDIRECT:
+            caminho = safe_join(PASTA_GRAVACOES, filename)
+            if caminho is None or not os.path.isfile(caminho):
+                abort(404)
+            resposta = Response()
+            # O nome vai codificado na URL (espaços, '%' e acentos no ID da câmera)
+            resposta.headers['X-Accel-Redirect'] = PLAYBACK_ACCEL_REDIRECT + quote(filename)
+            return resposta
+        
         # Envia o arquivo da pasta de gravações
+        # send_from_directory já responde requisições de intervalo (Range),
+        # então avançar/voltar o vídeo no player não baixa o arquivo inteiro
         return send_from_directory(PASTA_GRAVACOES, filename)
     
     # ============================================================================
@@ -504,8 +562,8 @@ def registrar_rotas(app):
         if not section or not new_config:
             return jsonify(success=False, message="Dados inválidos"), 400
         
-        # Carrega config atual
-        config = load_system_config()
+        # Carrega config atual (cópia: o dicionário carregado é o do cache)
+        config = copy.deepcopy(load_system_config())
         
         # Atualiza a seção específica
         if section not in config:
@@ -671,7 +729,12 @@ def registrar_rotas(app):
         user = get_current_user()
         has_manage_cameras = user_has_permission(user, 'manage_cameras') if user else False
         has_manage_settings = user_has_permission(user, 'manage_settings') if user else False
-        return render_template('export.html', user=user, has_manage_cameras=has_manage_cameras, has_manage_settings=has_manage_settings)
+        # Extensões gravadas pelas câmeras (as outras são de vídeos convertidos)
+        # O WebM também conta: é o formato de reserva quando o FFmpeg falha
+        formato = RECORDING_FORMATS.get(RECORDING_CODEC, RECORDING_FORMATS['VP80'])
+        recording_exts = sorted({formato['ext'].lstrip('.'), 'webm'})
+        return render_template('export.html', user=user, has_manage_cameras=has_manage_cameras, has_manage_settings=has_manage_settings,
+                               recording_exts=recording_exts)
     
     @app.route('/api/export/convert', methods=['POST'])
     @login_required
@@ -8,15 +8,57 @@ Este módulo calcula e fornece estatísticas do sistema VMS.
 
 import os
 import json
+import time
+import threading
 from datetime import datetime, timedelta
 from pathlib import Path
 from app.camera_manager import load_cameras_config, load_system_config
-from app.config import g_cameras
+from app.config import g_cameras, VIDEO_EXTENSIONS, STATS_CACHE_SECONDS
+
+# Cache: (nome da estatística, pasta) -> (momento do cálculo, resultado)
+_folder_cache = {}
+_folder_cache_lock = threading.Lock()
+
+
+def _cached_folder_stats(nome, folder_path, calcular):
+    """
+    Retorna o resultado de calcular(folder_path), reaproveitando o último
+    resultado se ele tiver menos de STATS_CACHE_SECONDS segundos.
+    
+    O resultado é compartilhado entre as requisições: não deve ser alterado.
+    
+    Args:
+        nome: Nome da estatística (parte da chave do cache)
+        folder_path: Pasta analisada
+        calcular: Função que faz a leitura da pasta
+    """
+    chave = (nome, folder_path)
+    with _folder_cache_lock:
+        agora = time.monotonic()
+        cache = _folder_cache.get(chave)
+        if cache is None or agora - cache[0] > STATS_CACHE_SECONDS:
+            cache = (agora, calcular(folder_path))
+            _folder_cache[chave] = cache
+        return cache[1]
 
 
 def get_disk_usage(folder_path):
     """
     Calcula o espaço usado em disco por uma pasta.
+    O resultado é reaproveitado por STATS_CACHE_SECONDS segundos.
+    
+    Args:
+        folder_path: Caminho da pasta
+        
+    Returns:
+        (total_size_bytes, total_size_mb, total_size_gb)
+    """
+    return _cached_folder_stats('disk', folder_path, _calc_disk_usage)
+
+
+def _calc_disk_usage(folder_path):
+    """
+    Calcula o espaço usado em disco por uma pasta.
     
     Args:
         folder_path: Caminho da pasta
@@ -46,6 +88,7 @@ def get_disk_usage(folder_path):
 def get_video_stats(folder_path):
     """
     Analisa os vídeos na pasta de gravações e retorna estatísticas.
+    O resultado é reaproveitado por STATS_CACHE_SECONDS segundos.
     
     Args:
         folder_path: Pasta onde estão os vídeos
@@ -53,6 +96,10 @@ def get_video_stats(folder_path):
     Returns:
         Dicionário com estatísticas de vídeos
     """
+    return _cached_folder_stats('videos', folder_path, _calc_video_stats)
+
+
+def _calc_video_stats(folder_path):
     stats = {
         'total_videos': 0,
         'videos_today': 0,
@@ -74,7 +121,7 @@ def get_video_stats(folder_path):
         month_start = datetime(now.year, now.month, 1)
         
         for filename in os.listdir(folder_path):
-            if not filename.endswith('.webm'):
+            if not filename.lower().endswith(VIDEO_EXTENSIONS):
                 continue
             
             filepath = os.path.join(folder_path, filename)
@@ -99,7 +146,7 @@ def get_video_stats(folder_path):
                 if mod_time >= month_start:
                     stats['videos_this_month'] += 1
                 
-                # Extrai nome da câmera do filename (formato: cam_id-timestamp.webm)
+                # Extrai nome da câmera do filename (formato: cam_id-timestamp.webm, .avi ou .mp4)
                 cam_id = filename.split('-')[0] if '-' in filename else 'unknown'
                 if cam_id not in stats['videos_by_camera']:
                     stats['videos_by_camera'][cam_id] = 0
@@ -5,14 +5,75 @@ VIDEO STREAM - Geração de stream de vídeo ao vivo
 
 Este arquivo contém a função que gera o stream de vídeo em tempo real
 para exibição no navegador web.
+
+Os frames já chegam prontos pelo CameraWorker (JPEG + cabeçalho do MJPEG),
+então aqui só enviamos os mesmos bytes para cada navegador conectado.
 """
 
-import cv2  # OpenCV - para codificar frames em JPEG
-import time  # Para fazer pequenas pausas
+import cv2  # OpenCV - codificação JPEG quando o TurboJPEG não está disponível
 
 # Importa o dicionário global de câmeras
 from app.config import g_cameras
 
+# Importa o TurboJPEG (opcional) - libjpeg-turbo usa SIMD (SSE/AVX/NEON)
+# e codifica JPEG bem mais rápido que o cv2.imencode
+try:
+    from turbojpeg import TurboJPEG, TJSAMP_420
+    _turbo_jpeg = TurboJPEG()
+    TURBOJPEG_AVAILABLE = True
+except Exception:
+    # ImportError (pacote não instalado) ou RuntimeError (biblioteca libturbojpeg não encontrada)
+    TURBOJPEG_AVAILABLE = False
+    print("AVISO: TurboJPEG não disponível. Instale: pip install PyTurboJPEG (e a libturbojpeg)")
+    print("       O stream ao vivo vai usar o cv2.imencode (mais lento).")
+
+
+# Início do cabeçalho de cada parte do stream MJPEG (igual para todos os frames)
+_CABECALHO_PARTE = b'--frame\r\nContent-Type: image/jpeg\r\nContent-Length: '
+
+
+def encode_jpeg(frame, quality=75):
+    """
+    Codifica um frame em JPEG.
+    Usa o TurboJPEG se estiver disponível, senão usa o OpenCV.
+    
+    frame: Imagem numpy (BGR)
+    quality: Qualidade do JPEG (0 a 100)
+    
+    Retorna: bytes do JPEG, ou None se a codificação falhar
+    """
+    if TURBOJPEG_AVAILABLE:
+        # Já retorna bytes (não precisa do .tobytes())
+        return _turbo_jpeg.encode(frame, quality=quality, jpeg_subsample=TJSAMP_420)
+    
+    # JPEG simples (baseline): sem a passada extra de otimização das tabelas
+    # de Huffman e sem o modo progressivo, que só deixam a codificação mais lenta
+    parametros = [cv2.IMWRITE_JPEG_QUALITY, quality,
+                  cv2.IMWRITE_JPEG_OPTIMIZE, 0,
+                  cv2.IMWRITE_JPEG_PROGRESSIVE, 0]
+    flag, buffer_codificado = cv2.imencode('.jpg', frame, parametros)
+    if not flag:
+        return None
+    return buffer_codificado.tobytes()
+
+
+def montar_parte_mjpeg(jpeg):
+    """
+    Monta uma parte do stream MJPEG (cabeçalho + JPEG) em um único bloco de bytes.
+    
+    É chamada uma vez por frame pelo CameraWorker, então cada cliente só
+    repassa o bloco pronto (sem concatenar uma cópia do JPEG por cliente)
+    e cada frame vira uma única escrita no socket.
+    
+    O cabeçalho Content-Length diz ao navegador o tamanho do JPEG, então
+    ele não precisa procurar o separador (--frame) dentro dos bytes da imagem.
+    
+    jpeg: Bytes do JPEG
+    
+    Retorna: bytes da parte, no formato multipart/x-mixed-replace
+    """
+    return b''.join((_CABECALHO_PARTE, str(len(jpeg)).encode('ascii'), b'\r\n\r\n', jpeg, b'\r\n'))
+
 
 def gerar_frames(cam_id):
     """
@@ -31,29 +92,34 @@ def gerar_frames(cam_id):
     # Pega o worker (objeto CameraWorker) da câmera solicitada
     worker = g_cameras[cam_id]
     
-    # Loop infinito - gera frames continuamente
-    while True:
-        # Pega o último frame processado da câmera
-        frame = worker.get_latest_frame()
-        
-        # Se não houver frame ainda (câmera acabou de iniciar), espera um pouco
-        if frame is None:
-            time.sleep(0.1)  # Espera 100 milissegundos
-            continue
-        
-        # Codifica o frame em formato JPEG
-        # Isso comprime a imagem para enviar pela internet
-        (flag, buffer_codificado) = cv2.imencode(".jpg", frame)
-        
-        # Se falhou a codificação, pula este frame
-        if not flag:
-            continue
-        
-        # Converte o buffer codificado em bytes
-        frame_em_bytes = buffer_codificado.tobytes()
-        
-        # Retorna o frame no formato MJPEG (Motion JPEG)
-        # Este é o formato usado para streaming de vídeo no navegador
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame_em_bytes + b'\r\n')
-
+    # Registra este cliente (o worker só codifica JPEG se houver alguém assistindo)
+    # last_seq = número do último frame enviado para este cliente
+    # Começa no frame atual para o primeiro envio já ser um JPEG codificado agora
+    with worker.frame_cv:
+        worker.stream_clients += 1
+        last_seq = worker.frame_seq
+    
+    try:
+        # Loop infinito - gera frames continuamente
+        while True:
+            # Dorme até o worker publicar um frame NOVO (no máximo 1 segundo)
+            # Assim não acorda à toa e nunca envia o mesmo frame duas vezes
+            # A parte do MJPEG já vem montada pelo worker, uma vez só para todos os clientes
+            with worker.frame_cv:
+                worker.frame_cv.wait_for(lambda: worker.frame_seq != last_seq, timeout=1.0)
+                if worker.frame_seq == last_seq:
+                    continue  # Nenhum frame novo (câmera lenta ou parada)
+                last_seq = worker.frame_seq
+                parte = worker.mjpeg_part
+            
+            # Se não houver frame ainda (câmera acabou de iniciar), espera o próximo
+            if parte is None:
+                continue
+            
+            # Retorna o frame no formato MJPEG (Motion JPEG)
+            # Este é o formato usado para streaming de vídeo no navegador
+            yield parte
+    finally:
+        # O cliente desconectou: remove da contagem
+        with worker.frame_cv:
+            worker.stream_clients -= 1
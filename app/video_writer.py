@@ -0,0 +1,74 @@
+"""
+================================================================================
+VIDEO WRITER - Gravação de vídeo via FFmpeg
+================================================================================
+
+Este arquivo contém a classe FFmpegWriter, que grava vídeo enviando os frames
+crus (BGR) para um processo do FFmpeg através de um pipe.
+
+Ela tem a mesma interface do cv2.VideoWriter (write, release, isOpened),
+então pode ser usada no lugar dele sem mudar o resto do código.
+Com o FFmpeg é possível usar codificadores de hardware (h264_nvenc,
+h264_v4l2m2m, h264_qsv...), que quase não usam a CPU.
+"""
+
+import subprocess
+import numpy as np
+
+
+class FFmpegWriter:
+    """
+    Grava vídeo enviando frames para o FFmpeg pelo stdin.
+    """
+
+    def __init__(self, filename, fps, frame_size, codec_args):
+        """
+        Inicia o processo do FFmpeg.
+
+        filename: Caminho do arquivo de saída
+        fps: Frames por segundo do vídeo
+        frame_size: (largura, altura) dos frames
+        codec_args: Argumentos do codificador (ex: ['-c:v', 'h264_nvenc'])
+
+        Lança FileNotFoundError se o FFmpeg não estiver instalado.
+        """
+        self.filename = filename
+        largura, altura = frame_size
+        cmd = [
+            'ffmpeg', '-y', '-loglevel', 'error',
+            # Entrada: frames crus BGR pelo stdin
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24',
+            '-s', f'{largura}x{altura}', '-r', str(fps),
+            '-i', '-',
+            *codec_args,
+            filename
+        ]
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+    def isOpened(self):
+        """
+        Retorna True enquanto o processo do FFmpeg estiver rodando.
+        """
+        return self.proc.poll() is None
+
+    def write(self, frame):
+        """
+        Envia um frame para o FFmpeg.
+
+        frame: Imagem numpy (BGR) com o tamanho informado em frame_size
+        """
+        # memoryview evita copiar o frame para um objeto bytes
+        self.proc.stdin.write(memoryview(np.ascontiguousarray(frame)))
+
+    def release(self):
+        """
+        Fecha o pipe e espera o FFmpeg terminar de escrever o arquivo.
+        """
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
@@ -58,8 +58,11 @@ def gerar_certificado():
     key_path = os.path.join(config_dir, 'key.pem')
     
     # Comando OpenSSL
+    # Chave ECDSA P-256: gerada quase na hora (RSA-4096 pode levar segundos)
     cmd = [
-        'openssl', 'req', '-x509', '-newkey', 'rsa:4096',
+        'openssl', 'req', '-x509',
+        '-newkey', 'ec', '-pkeyopt', 'ec_paramgen_curve:prime256v1',
+        '-sha256',  # Assinatura SHA-256 (versões antigas do openssl usavam SHA-1)
         '-nodes',  # Não criptografa a chave privada
         '-out', cert_path,
         '-keyout', key_path,
@@ -11,7 +11,7 @@ O QUE ESTE CÓDIGO FAZ:
 - Transmite vídeo ao vivo de cada câmera na interface web
 - Permite gravar vídeo manualmente (botão "Gravar Manual")
 - Detecta movimento e grava automaticamente quando detecta
-- Salva os vídeos na pasta "gravacoes" no formato .webm
+- Salva os vídeos na pasta "gravacoes" (.webm, .avi ou .mp4, conforme RECORDING_CODEC)
 - Permite assistir as gravações através do player na interface
 
 COMO FUNCIONA:
@@ -29,9 +29,17 @@ COMO FUNCIONA:
 
 from flask import Flask  # Flask - cria o servidor web
 import os  # Para criar pastas
+import threading  # Verifica o banco de dados em segundo plano
+import time  # Para medir o tempo de abertura das câmeras
+import signal  # Para encerrar corretamente com SIGTERM
+from concurrent.futures import ThreadPoolExecutor  # Abre as câmeras em paralelo
+import cv2  # OpenCV - para ativar o OpenCL
 
 # Importa as configurações
-from app.config import PASTA_GRAVACOES, g_cameras
+from app.config import (
+    PASTA_GRAVACOES, ACCELERATE, SERVER_THREADS, SERVER_CONNECTION_LIMIT, CPU_AFFINITY,
+    g_cameras
+)
 
 # Importa a classe CameraWorker
 from app.camera_worker import CameraWorker
@@ -47,6 +55,17 @@ from app.camera_manager import load_cameras_config, load_system_config
 from dotenv import load_dotenv
 load_dotenv()
 
+# Importa o Waitress (opcional) - servidor WSGI de produção
+# Aguenta bem mais navegadores assistindo o stream ao mesmo tempo
+# do que o servidor de desenvolvimento do Flask (app.run)
+try:
+    from waitress import serve
+    WAITRESS_AVAILABLE = True
+except ImportError:
+    WAITRESS_AVAILABLE = False
+    print("AVISO: Waitress não disponível. Instale: pip install waitress")
+    print("       O servidor HTTP vai usar o servidor de desenvolvimento do Flask.")
+
 # ============================================================================
 # CRIAÇÃO DO APP FLASK
 # ============================================================================
@@ -62,6 +81,10 @@ app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
 USE_HTTPS = os.getenv('USE_HTTPS', 'False').lower() == 'true'
 SSL_CERT_PATH = os.getenv('SSL_CERT_PATH', 'config/cert.pem')
 SSL_KEY_PATH = os.getenv('SSL_KEY_PATH', 'config/key.pem')
+# Modo de depuração do Flask (só para desenvolvimento): FLASK_DEBUG=True no .env
+# Deixa cada requisição mais lenta e o depurador permite executar código pelo
+# navegador quando ocorre um erro, então fica desligado por padrão
+FLASK_DEBUG = os.getenv('FLASK_DEBUG', 'False').lower() in ('1', 'true')
 # Configuração de cookies de sessão
 # Para desenvolvimento com certificado auto-assinado, é CRÍTICO
 # permitir cookies mesmo com certificado não confiável
@@ -93,6 +116,167 @@ app.config['PERMANENT_SESSION_LIFETIME'] = 86400  # 24 horas
 registrar_rotas_auth(app)  # Registra rotas de autenticação primeiro
 registrar_rotas(app)  # Registra rotas principais (protegidas)
 
+# ============================================================================
+# CERTIFICADOS SSL (HTTPS)
+# ============================================================================
+
+def certificado_valido(cert_path, key_path):
+    """
+    Verifica se já existe um certificado SSL que pode ser reaproveitado.
+    
+    cert_path: Caminho do certificado (PEM)
+    key_path: Caminho da chave privada (PEM)
+    
+    Retorna: True se os dois arquivos existem, não estão vazios e o
+             certificado ainda não venceu
+    """
+    # Um único os.stat por arquivo: diz se existe e o tamanho
+    try:
+        if os.stat(cert_path).st_size == 0 or os.stat(key_path).st_size == 0:
+            return False
+    except FileNotFoundError:
+        return False
+    
+    # Confere a data de validade (só se a biblioteca cryptography estiver instalada)
+    try:
+        from cryptography import x509
+    except ImportError:
+        return True
+    
+    import datetime
+    try:
+        with open(cert_path, 'rb') as f:
+            cert = x509.load_pem_x509_certificate(f.read())
+    except ValueError:
+        return False  # Arquivo corrompido
+    return cert.not_valid_after_utc > datetime.datetime.now(datetime.timezone.utc)
+
+
+def gerar_certificado(cert_path, key_path, dias=365):
+    """
+    Gera um certificado SSL auto-assinado para localhost.
+    
+    Usa uma chave ECDSA P-256 em vez de RSA-4096: a geração é quase
+    instantânea (RSA-4096 pode levar segundos em máquinas fracas, atrasando
+    a inicialização do servidor) e o navegador aceita do mesmo jeito.
+    Usa a biblioteca cryptography, se instalada, senão chama o openssl.
+    
+    cert_path: Onde salvar o certificado (PEM)
+    key_path: Onde salvar a chave privada (PEM)
+    dias: Validade do certificado em dias
+    
+    Lança FileNotFoundError se nem a cryptography nem o openssl estiverem disponíveis
+    """
+    for caminho in (cert_path, key_path):
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+    
+    try:
+        from cryptography import x509
+        from cryptography.x509.oid import NameOID
+        from cryptography.hazmat.primitives import hashes, serialization
+        from cryptography.hazmat.primitives.asymmetric import ec
+    except ImportError:
+        # Sem a cryptography: usa o openssl (linha de comando)
+        import subprocess
+        cmd = [
+            'openssl', 'req', '-x509',
+            '-newkey', 'ec', '-pkeyopt', 'ec_paramgen_curve:prime256v1',
+            '-sha256',  # Assinatura SHA-256 (versões antigas do openssl usavam SHA-1)
+            '-nodes',  # Não criptografa a chave privada
+            '-out', cert_path,
+            '-keyout', key_path,
+            '-days', str(dias),
+            '-subj', '/C=BR/ST=SP/L=SaoPaulo/O=VMS/CN=localhost'
+        ]
+        subprocess.run(cmd, capture_output=True, timeout=30, check=True)
+        return
+    
+    import datetime
+    chave = ec.generate_private_key(ec.SECP256R1())
+    nome = x509.Name([
+        x509.NameAttribute(NameOID.COUNTRY_NAME, 'BR'),
+        x509.NameAttribute(NameOID.STATE_OR_PROVINCE_NAME, 'SP'),
+        x509.NameAttribute(NameOID.LOCALITY_NAME, 'SaoPaulo'),
+        x509.NameAttribute(NameOID.ORGANIZATION_NAME, 'VMS'),
+        x509.NameAttribute(NameOID.COMMON_NAME, 'localhost'),
+    ])
+    agora = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(nome)
+        .issuer_name(nome)  # Auto-assinado: emissor = dono
+        .public_key(chave.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(agora)
+        .not_valid_after(agora + datetime.timedelta(days=dias))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName('localhost')]), critical=False)
+        .sign(chave, hashes.SHA256())
+    )
+    
+    # A chave privada só pode ser lida pelo dono (0600, como o openssl faz)
+    fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    # O modo do os.open só vale para arquivos novos: corrige uma chave antiga
+    os.chmod(key_path, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(chave.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.TraditionalOpenSSL,
+            serialization.NoEncryption()
+        ))
+    with open(cert_path, 'wb') as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+
+
+def iniciar_camera(cam_id, source):
+    """
+    Cria o CameraWorker de uma câmera e inicia a thread dele.
+    É chamada em paralelo para cada câmera pelo main().
+    
+    cam_id: ID da câmera
+    source: Fonte da câmera (número da webcam, URL RTSP ou arquivo)
+    
+    Retorna: (worker, tempo em segundos que levou para abrir a câmera)
+    """
+    inicio = time.perf_counter()
+    
+    # Cria um novo CameraWorker para esta câmera (abre a câmera)
+    worker = CameraWorker(cam_id, source)
+    
+    # Inicia a thread (faz o loop run() começar a rodar)
+    worker.start()
+    
+    return worker, time.perf_counter() - inicio
+
+
+def tratar_sigterm(signum, frame):
+    """
+    Trata o sinal SIGTERM (pedido de encerramento do sistema) como um Ctrl+C.
+    Assim o bloco finally fecha as gravações e as câmeras antes de sair.
+    """
+    raise KeyboardInterrupt
+
+
+def encerrar_cameras():
+    """
+    Fecha todas as câmeras ao mesmo tempo.
+    Cada release() espera a gravação em andamento ser salva, então em
+    paralelo o encerramento demora o tempo da câmera mais lenta, e não a soma.
+    """
+    if not g_cameras:
+        return
+    
+    def liberar(worker):
+        try:
+            worker.release()
+        except Exception as e:
+            print(f"ERRO ao liberar câmera {worker.cam_id}: {e}")
+    
+    with ThreadPoolExecutor(max_workers=len(g_cameras)) as executor:
+        executor.map(liberar, list(g_cameras.values()))
+
+
 # ============================================================================
 # FUNÇÃO PRINCIPAL
 # ============================================================================
@@ -102,16 +286,27 @@ def main():
     Função principal que inicia o servidor.
     Ela é executada quando o programa é rodado.
     """
-    # Inicializa o banco de dados (se estiver usando)
+    # Prende o servidor aos núcleos escolhidos (antes de criar qualquer thread,
+    # porque as threads novas herdam os núcleos da thread que as cria)
+    if CPU_AFFINITY:
+        try:
+            if hasattr(os, 'sched_setaffinity'):
+                os.sched_setaffinity(0, CPU_AFFINITY)  # Linux
+            else:
+                import psutil  # Windows (o macOS não permite escolher núcleos)
+                psutil.Process().cpu_affinity(sorted(CPU_AFFINITY))
+            print(f"Servidor limitado aos núcleos da CPU: {sorted(CPU_AFFINITY)}")
+        except Exception as e:
+            print(f"AVISO: Não foi possível definir os núcleos da CPU ({CPU_AFFINITY}): {e}")
+    
+    # Inicializa o banco de dados (se estiver usando) em segundo plano:
+    # as câmeras começam sem esperar pelo MySQL, e o aviso de banco
+    # indisponível aparece uma vez só (app/database.py)
     try:
-        from app.database import init_database
-        init_database()
-        print("Banco de dados inicializado.")
+        from app.database import garantir_tabelas
+        threading.Thread(target=garantir_tabelas, daemon=True).start()
     except ImportError:
         print("AVISO: Módulo database.py não encontrado. Usando armazenamento JSON (legado).")
-    except Exception as e:
-        print(f"AVISO: Erro ao inicializar banco de dados: {e}")
-        print("Continuando com armazenamento JSON (legado)...")
     
     # Carrega configuração de câmeras do arquivo JSON
     print("Carregando configuração de câmeras...")
@@ -132,38 +327,53 @@ def main():
         os.makedirs(pasta_gravacoes)  # Cria a pasta
         print(f"Pasta '{pasta_gravacoes}' criada.")
     
+    # Ativa (ou desativa) o OpenCL antes de iniciar as câmeras
+    # Cada câmera verifica isso ao ser criada para decidir se usa a GPU
+    cv2.ocl.setUseOpenCL(ACCELERATE)
+    if ACCELERATE and cv2.ocl.haveOpenCL() and cv2.ocl.useOpenCL():
+        print("OpenCL ativado: a detecção de movimento vai usar a GPU.")
+    else:
+        print("OpenCL desativado ou não disponível: a detecção de movimento vai usar a CPU.")
+    
     # Inicializa todas as câmeras habilitadas do arquivo de configuração
     print("\n=== INICIANDO WORKERS DAS CAMERAS ===")
     
-    # Para cada câmera na configuração
+    # Separa as câmeras habilitadas
+    cameras_habilitadas = {}
     for cam_id, cam_data in cameras_config.items():
         # Só inicia câmeras que estão habilitadas
         if not cam_data.get('enabled', True):
             print(f"[SKIP] Camera '{cam_id}' esta desabilitada.")
             continue
         
-        source = cam_data.get('source')
-        name = cam_data.get('name', cam_id)
-        
-        print(f"\n[INIT] Iniciando camera '{name}'")
+        print(f"\n[INIT] Iniciando camera '{cam_data.get('name', cam_id)}'")
         print(f"       ID: {cam_id}")
-        print(f"       Fonte: {source}")
-        
-        try:
-            # Cria um novo CameraWorker para esta câmera
-            print(f"       Criando CameraWorker...")
-            worker = CameraWorker(cam_id, source)
-            
-            # Inicia a thread (faz o loop run() começar a rodar)
-            print(f"       Iniciando thread...")
-            worker.start()
-            
-            # Armazena o worker no dicionário global
-            g_cameras[cam_id] = worker
-            print(f"       [OK] Camera '{name}' iniciada com sucesso!")
-            
-        except Exception as e:
-            print(f"       [ERRO] Falha ao iniciar camera '{name}': {e}")
+        print(f"       Fonte: {cam_data.get('source')}")
+        cameras_habilitadas[cam_id] = cam_data
+    
+    # Abre todas as câmeras ao mesmo tempo
+    # Abrir uma câmera (USB ou de rede) pode travar por centenas de ms esperando
+    # a resposta dela; em paralelo, o tempo total é o da câmera mais lenta,
+    # e não a soma de todas
+    if cameras_habilitadas:
+        with ThreadPoolExecutor(max_workers=min(8, len(cameras_habilitadas))) as executor:
+            futuros = {
+                executor.submit(iniciar_camera, cam_id, cam_data.get('source')): cam_id
+                for cam_id, cam_data in cameras_habilitadas.items()
+            }
+            # Percorre na ordem da configuração (e não na ordem em que cada uma
+            # terminou de abrir), para a lista de câmeras não mudar a cada início
+            for futuro in futuros:
+                cam_id = futuros[futuro]
+                name = cameras_habilitadas[cam_id].get('name', cam_id)
+                try:
+                    worker, segundos = futuro.result()
+                    
+                    # Armazena o worker no dicionário global
+                    g_cameras[cam_id] = worker
+                    print(f"       [OK] Camera '{name}' iniciada com sucesso! ({segundos:.2f}s)")
+                except Exception as e:
+                    print(f"       [ERRO] Falha ao iniciar camera '{name}': {e}")
     
     print(f"\n=== WORKERS INICIADOS: {len(g_cameras)} camera(s) ativa(s) ===")
     print(f"\n=== INICIANDO SERVIDOR FLASK ===")
@@ -176,45 +386,29 @@ def main():
     
     # Verifica se deve usar HTTPS
     if use_https:
-        # Verifica se os certificados existem
-        if not os.path.exists(SSL_CERT_PATH) or not os.path.exists(SSL_KEY_PATH):
-            print(f"\n⚠️  AVISO: Certificados SSL não encontrados!")
+        # Só gera certificados se eles não existem, estão vazios ou venceram
+        # (senão reaproveita os que já estão salvos)
+        if not certificado_valido(SSL_CERT_PATH, SSL_KEY_PATH):
+            print(f"\n⚠️  AVISO: Certificados SSL não encontrados, vazios ou vencidos!")
             print(f"   Certificado: {SSL_CERT_PATH}")
             print(f"   Chave: {SSL_KEY_PATH}")
             print(f"\n   🔄 Tentando gerar certificados automaticamente...")
             
             # Tenta gerar certificados automaticamente
             try:
-                import subprocess
-                import sys
-                
-                # Comando para gerar certificado auto-assinado
-                cmd = [
-                    'openssl', 'req', '-x509', '-newkey', 'rsa:4096',
-                    '-nodes',  # Não criptografa a chave privada
-                    '-out', SSL_CERT_PATH,
-                    '-keyout', SSL_KEY_PATH,
-                    '-days', '365',
-                    '-subj', '/C=BR/ST=SP/L=SaoPaulo/O=VMS/CN=localhost'
-                ]
-                
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-                
-                if result.returncode == 0 and os.path.exists(SSL_CERT_PATH) and os.path.exists(SSL_KEY_PATH):
-                    print(f"   ✅ Certificados gerados com sucesso!")
-                    print(f"   📋 Certificado: {os.path.abspath(SSL_CERT_PATH)}")
-                    print(f"   📋 Chave: {os.path.abspath(SSL_KEY_PATH)}")
-                else:
-                    raise Exception("Falha ao gerar certificados")
+                gerar_certificado(SSL_CERT_PATH, SSL_KEY_PATH)
+                print(f"   ✅ Certificados gerados com sucesso!")
+                print(f"   📋 Certificado: {os.path.abspath(SSL_CERT_PATH)}")
+                print(f"   📋 Chave: {os.path.abspath(SSL_KEY_PATH)}")
                     
             except FileNotFoundError:
                 print(f"   ❌ OpenSSL não encontrado!")
                 print(f"\n   💡 Soluções:")
-                print(f"   1. Instale OpenSSL:")
-                print(f"      Windows: Baixe de https://slproweb.com/products/Win32OpenSSL.html")
+                print(f"   1. Instale a biblioteca cryptography: pip install cryptography")
+                print(f"      Ou instale o OpenSSL (Windows: https://slproweb.com/products/Win32OpenSSL.html)")
                 print(f"      Ou use: python scripts/gerar_certificado_ssl.py")
                 print(f"   2. Gere manualmente:")
-                print(f"      openssl req -x509 -newkey rsa:4096 -nodes -out {SSL_CERT_PATH} -keyout {SSL_KEY_PATH} -days 365")
+                print(f"      openssl req -x509 -newkey ec -pkeyopt ec_paramgen_curve:prime256v1 -sha256 -nodes -out {SSL_CERT_PATH} -keyout {SSL_KEY_PATH} -days 365")
                 print(f"   3. Desative HTTPS: USE_HTTPS=False no .env")
                 print(f"\n   Iniciando sem HTTPS...")
                 use_https = False
@@ -225,32 +419,10 @@ def main():
                 print(f"\n   Iniciando sem HTTPS...")
                 use_https = False
         else:
-            # Certificados existem, verifica se são válidos
+            # Certificados existem e estão dentro da validade
             print(f"   ✅ Certificados encontrados:")
             print(f"      Certificado: {os.path.abspath(SSL_CERT_PATH)}")
             print(f"      Chave: {os.path.abspath(SSL_KEY_PATH)}")
-            
-            # Verifica tamanho dos arquivos
-            cert_size = os.path.getsize(SSL_CERT_PATH)
-            key_size = os.path.getsize(SSL_KEY_PATH)
-            print(f"      Tamanho certificado: {cert_size} bytes")
-            print(f"      Tamanho chave: {key_size} bytes")
-            
-            if cert_size == 0 or key_size == 0:
-                print(f"   ⚠️  AVISO: Certificados estão vazios! Gerando novos...")
-                try:
-                    import subprocess
-                    cmd = [
-                        'openssl', 'req', '-x509', '-newkey', 'rsa:4096',
-                        '-nodes', '-out', SSL_CERT_PATH, '-keyout', SSL_KEY_PATH,
-                        '-days', '365', '-subj', '/C=BR/ST=SP/L=SaoPaulo/O=VMS/CN=localhost'
-                    ]
-                    subprocess.run(cmd, capture_output=True, timeout=30, check=True)
-                    print(f"   ✅ Novos certificados gerados!")
-                except Exception as e:
-                    print(f"   ❌ Erro: {e}")
-                    print(f"   Iniciando sem HTTPS...")
-                    use_https = False
     
     if use_https:
         protocol = 'https'
@@ -290,8 +462,10 @@ def main():
     # Inicia o servidor Flask
     # host='0.0.0.0' = aceita conexões de qualquer IP
     # port = porta do servidor (padrão 5000)
-    # debug=True com HTTPS para ver erros (ajuda a diagnosticar problemas)
+    # debug = modo de depuração do Werkzeug (desligado, a não ser com FLASK_DEBUG=True)
     # threaded=True = permite múltiplas requisições simultâneas
+    # Sem HTTPS, usa o Waitress (se instalado) no lugar do app.run
+    # O Waitress não faz HTTPS sozinho, então com HTTPS continua o app.run
     try:
         if use_https:
             print(f"\n🔒 Iniciando servidor HTTPS na porta {port}...")
@@ -303,25 +477,40 @@ def main():
                 import ssl
                 context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
                 context.load_cert_chain(SSL_CERT_PATH, SSL_KEY_PATH)
+                # Só TLS 1.2 ou mais novo, e no TLS 1.2 só cifras ECDHE com AES-GCM/ChaCha20
+                # (rápidas e seguras; o TLS 1.3 já usa só cifras modernas)
+                # O retorno da sessão (session tickets) já vem ligado por padrão:
+                # o navegador que reconecta não refaz o handshake completo
+                context.minimum_version = ssl.TLSVersion.TLSv1_2
+                context.set_ciphers('ECDHE+AESGCM:ECDHE+CHACHA20')
                 print(f"   ✅ Certificados validados com sucesso!")
             except Exception as e:
-                print(f"   ⚠️  AVISO: Problema ao validar certificados: {e}")
-                print(f"   Continuando mesmo assim...")
-                context = (SSL_CERT_PATH, SSL_KEY_PATH)
+                # O app.run leria os mesmos arquivos e falharia do mesmo jeito:
+                # para aqui, com a mensagem do problema
+                print(f"   ❌ ERRO: Certificados inválidos: {e}")
+                print(f"   💡 Apague {SSL_CERT_PATH} e {SSL_KEY_PATH} para gerar novos,")
+                print(f"      ou desative HTTPS: USE_HTTPS=False no .env")
+                raise SystemExit(1)
             
             print(f"\n🚀 Servidor iniciando...")
             app.run(
                 host='0.0.0.0', 
                 port=port, 
-                debug=True,  # Ativa debug para ver erros
+                debug=FLASK_DEBUG,
                 threaded=True,
-                ssl_context=(SSL_CERT_PATH, SSL_KEY_PATH),
-                use_reloader=False,  # Desativa reloader para evitar problemas
-                use_debugger=True  # Ativa debugger
+                ssl_context=context,  # Contexto já carregado acima (não lê os certificados de novo)
+                use_reloader=False  # Desativa reloader para evitar problemas
             )
         else:
             print(f"\n🌐 Iniciando servidor HTTP na porta {port}...")
-            app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
+            if WAITRESS_AVAILABLE and not FLASK_DEBUG:
+                # threads = requisições atendidas ao mesmo tempo (cada stream ao vivo ocupa uma)
+                # channel_timeout = fecha conexões paradas depois de 10 minutos
+                serve(app, host='0.0.0.0', port=port, threads=SERVER_THREADS,
+                      connection_limit=SERVER_CONNECTION_LIMIT, channel_timeout=600)
+            else:
+                app.run(host='0.0.0.0', port=port, debug=FLASK_DEBUG, threaded=True,
+                        use_reloader=False)
     except OSError as e:
         if "Address already in use" in str(e) or "already in use" in str(e).lower():
             print(f"\n❌ ERRO: Porta {port} já está em uso!")
@@ -350,6 +539,9 @@ if __name__ == '__main__':
     Este bloco só executa se o arquivo for rodado diretamente
     (não se for importado como módulo).
     """
+    # SIGTERM (ex: systemctl stop, docker stop) passa pelo mesmo encerramento do Ctrl+C
+    signal.signal(signal.SIGTERM, tratar_sigterm)
+    
     try:
         # Chama a função principal
         main()
@@ -360,5 +552,4 @@ if __name__ == '__main__':
         # Este bloco SEMPRE executa, mesmo se der erro
         # Limpa os recursos: fecha todas as câmeras
         print("Encerrando... liberando câmeras.")
-        for cam_id in g_cameras:
-            g_cameras[cam_id].release()
+        encerrar_cameras()